@@ -13,12 +13,19 @@ Setup:
   - Add INTERNAL_API_SECRET=<random-long-string> to both .env files
   - Generate one with: python -c "import secrets; print(secrets.token_hex(32))"
 """
+import hmac
 import os
 from fastapi import Header, HTTPException, Depends
 from typing import Annotated
 
 
 SECRET = os.getenv("INTERNAL_API_SECRET", "")
+_SECRET_BYTES = SECRET.encode("utf-8")
+
+
+def is_valid_secret(value: str) -> bool:
+    """Constant-time check of a presented secret — don't leak how many leading characters matched."""
+    return bool(SECRET) and hmac.compare_digest(value.encode("utf-8"), _SECRET_BYTES)
 
 
 def verify_internal_secret(x_internal_secret: Annotated[str, Header()] = "") -> None:
@@ -29,7 +36,7 @@ def verify_internal_secret(x_internal_secret: Annotated[str, Header()] = "") ->
             status_code=503,
             detail="Service not configured (INTERNAL_API_SECRET not set)"
         )
-    if x_internal_secret != SECRET:
+    if not is_valid_secret(x_internal_secret):
         raise HTTPException(
             status_code=403,
             detail="Forbidden: invalid or missing internal secret"
@@ -0,0 +1,97 @@
+"""
+Circuit breaker for upstream AI calls.
+
+During a sustained OpenAI outage every request would otherwise sit through
+the full timeout and retry budget, tying up workers. After fail_max
+consecutive failures the breaker opens and calls fail immediately with
+CircuitOpenError until reset_timeout has passed; then a single trial call
+is let through to decide whether to close again.
+"""
+import time
+from typing import Any, Awaitable, Callable
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because the circuit is open."""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker for async callables.
+
+    Args:
+        fail_max: Consecutive failures before the circuit opens
+        reset_timeout: Seconds to stay open before allowing a trial call
+        exclude: Predicate for exceptions that show the upstream is up (the
+            caller's fault, or throttling) and don't count as failures
+    """
+
+    def __init__(
+        self,
+        fail_max: int,
+        reset_timeout: float,
+        exclude: Callable[[Exception], bool] | None = None
+    ):
+        self.fail_max = fail_max
+        self.reset_timeout = reset_timeout
+        self.exclude = exclude
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._trial_in_flight = False
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+    def _before_call(self) -> bool:
+        """Admit or reject a call; returns True if it is the half-open trial."""
+        if self._opened_at is None:
+            return False
+        if self._trial_in_flight or time.monotonic() - self._opened_at < self.reset_timeout:
+            raise CircuitOpenError("Circuit open: upstream AI service unavailable")
+        self._trial_in_flight = True  # Half-open: this call decides
+        return True
+
+    def _on_success(self, trial: bool) -> None:
+        if trial:
+            # Half-open trial succeeded: close
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+        elif self._opened_at is None:
+            self._failures = 0
+        # A straggler admitted before the circuit opened doesn't get to close it
+
+    def _on_failure(self, trial: bool) -> None:
+        self._failures += 1
+        if trial:
+            self._opened_at = time.monotonic()  # Still down: another full timeout
+            self._trial_in_flight = False
+        elif self._opened_at is None and self._failures >= self.fail_max:
+            self._opened_at = time.monotonic()
+        # A straggler failing while already open changes nothing
+
+    async def call(self, func: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """
+        Run func through the breaker.
+
+        Raises:
+            CircuitOpenError: If the circuit is open
+        """
+        trial = self._before_call()
+        try:
+            result = await func(*args, **kwargs)
+        except Exception as e:
+            if self.exclude is not None and self.exclude(e):
+                # Upstream answered; the request was bad or throttled
+                self._on_success(trial)
+            else:
+                self._on_failure(trial)
+            raise
+        except BaseException:
+            # Cancelled: no verdict, let the next call run the trial
+            if trial:
+                self._trial_in_flight = False
+            raise
+        self._on_success(trial)
+        return result
@@ -4,7 +4,9 @@ Configuration and constants for Resonate Microservice.
 import os
 from dotenv import load_dotenv
 
-load_dotenv()
+# Production containers export real env vars — skip the .env stat/parse on every worker spawn
+if os.getenv("APP_ENV", "dev") != "prod":
+    load_dotenv()
 
 
 class Settings:
@@ -13,6 +15,8 @@ class Settings:
     # OpenAI Configuration
     OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "")
     OPENAI_MODEL: str = "gpt-4.1-mini"
+    OPENAI_MAX_CONCURRENCY: int = int(os.getenv("OPENAI_MAX_CONCURRENCY", 8))  # In-flight calls per worker
+    USE_RAW_HTTP: bool = os.getenv("USE_RAW_HTTP", "false").lower() == "true"  # POST completions without the SDK
     
     # Server Configuration
     PORT: int = int(os.getenv("PORT", 10000))
@@ -20,6 +24,24 @@ class Settings:
     
     # Request Configuration
     PDF_DOWNLOAD_TIMEOUT: int = 20
+
+    # Rate Limiting — shared Redis storage so limits hold across workers/replicas
+    REDIS_URL: str = os.getenv("REDIS_URL", "")
+
+    # LLM Response Cache (temperature-0 calls only)
+    LLM_CACHE_BACKEND: str = os.getenv("LLM_CACHE_BACKEND", "memory")  # memory | redis | none
+    LLM_CACHE_TTL: int = int(os.getenv("LLM_CACHE_TTL", 3600))  # seconds
+    LLM_CACHE_MAXSIZE: int = 1024  # entries, memory backend only
+    REPORT_CACHE_TTL: int = int(os.getenv("REPORT_CACHE_TTL", 86400))  # /parse-report results, seconds
+    REPORT_CACHE_MAXSIZE: int = 256  # entries, memory backend only
+
+    # Plan Cache (workout / meal plans) — opt-in, reuses plans for matching profiles
+    PLAN_CACHE_ENABLED: bool = os.getenv("PLAN_CACHE_ENABLED", "false").lower() == "true"
+    PLAN_CACHE_TTL: int = int(os.getenv("PLAN_CACHE_TTL", 86400))  # seconds
+    PLAN_CACHE_MAXSIZE: int = 2000  # entries, memory backend only
+
+    # Text-native reports whose values a strict regex reads unambiguously skip the AI call
+    LOCAL_EXTRACTION_ENABLED: bool = os.getenv("LOCAL_EXTRACTION_ENABLED", "true").lower() == "true"
     
     # AI Temperature Settings
     TEMPERATURE_EXTRACTION: float = 0.0  # Precise extraction
@@ -27,8 +49,20 @@ class Settings:
     TEMPERATURE_ANALYSIS: float = 0.5    # Balanced analysis
     
     # PDF Processing
-    PDF_PREVIEW_PAGES: int = 2  # Pages to use for classification
-    PDF_RENDER_SCALE: int = 2   # Render quality multiplier
+    # Every page renders with its long side at PDF_RENDER_PX, whatever its size:
+    # A4 (842pt) → scale ~1.82, ~131 DPI; US Letter (792pt) → ~1.94, ~140 DPI
+    PDF_RENDER_PX: int = 1536
+    PDF_JPEG_QUALITY: int = 70
+    # Render pool size per web worker — every gunicorn worker spawns its own pool,
+    # so split the cores between them instead of giving each one all of them
+    WEB_WORKERS: int = int(os.getenv("GUNICORN_WORKERS", os.getenv("WEB_CONCURRENCY", 1)))
+    PDF_RENDER_WORKERS: int = int(os.getenv(
+        "PDF_RENDER_WORKERS", max(1, (os.cpu_count() or 1) // max(1, WEB_WORKERS))
+    ))
+
+    # Download cache (per worker) — same URL within the TTL is served from memory
+    DOWNLOAD_CACHE_TTL: int = int(os.getenv("DOWNLOAD_CACHE_TTL", 300))  # seconds
+    DOWNLOAD_CACHE_MAX_BYTES: int = 100 * 1024 * 1024  # 100 MB
 
     @classmethod
     def validate(cls) -> None:
@@ -1,8 +1,65 @@
 """
 Rate limiter configuration.
 """
+import hashlib
+from functools import lru_cache
+
+from fastapi import Request
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 
-# Rate limiter — uses client IP as key
-limiter = Limiter(key_func=get_remote_address)
+from app.core.auth import is_valid_secret
+from app.core.config import settings
+
+
+# Per-endpoint budgets — vision/OCR calls cost far more than text generation
+EXPENSIVE_LIMIT = "5/minute"   # /parse-report, /analyze-food
+STANDARD_LIMIT = "10/minute"   # text-only generation endpoints
+PUBLIC_LIMIT = "60/minute"     # unauthenticated health endpoints
+
+TRUSTED_TIER = "trusted-internal"
+
+
+@lru_cache(maxsize=32)
+def _credential_tag(secret: str) -> str:
+    """Short, non-reversible tag for a caller credential (keeps Redis keys small)."""
+    return hashlib.blake2b(secret.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def internal_caller_key(request: Request) -> str:
+    """
+    Rate-limit key for authenticated internal routes.
+
+    Every call arrives from the Resonate-Server, so the client IP alone would
+    put all users in one bucket. Key by (credential, tenant, IP) instead; slowapi
+    already scopes each key to the decorated endpoint. Limits are evaluated
+    after verify_internal_secret, so the credential here is already validated.
+    """
+    credential = _credential_tag(request.headers.get("X-Internal-Secret", ""))
+    tenant = request.headers.get("X-Tenant-Id", "-")
+    return f"{credential}:{tenant}:{get_remote_address(request)}"
+
+
+def is_trusted_internal(request: Request) -> bool:
+    """
+    exempt_when hook — skip limit storage for the server's trusted tier.
+
+    The Resonate-Server opts in with X-Tier: trusted-internal. The header only
+    counts alongside a valid secret, so untrusted callers stay rate limited.
+    """
+    return (
+        request.headers.get("X-Tier") == TRUSTED_TIER
+        and is_valid_secret(request.headers.get("X-Internal-Secret", ""))
+    )
+
+
+# Rate limiter — keyed by caller on internal routes; public routes override with IP only.
+# With REDIS_URL set, counters live in Redis (moving window, evaluated atomically
+# by Lua scripts in the `limits` Redis storage) so every gunicorn worker and replica
+# enforces the same budget. Without it, falls back to per-process memory (dev only).
+limiter = Limiter(
+    key_func=internal_caller_key,
+    storage_uri=settings.REDIS_URL or "memory://",
+    strategy="moving-window",
+    in_memory_fallback_enabled=bool(settings.REDIS_URL),
+)
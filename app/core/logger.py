@@ -1,11 +1,42 @@
 """
 Structured logging for Resonate Microservice.
 """
+import atexit
 import logging
+import logging.handlers
+import queue
 import sys
 from datetime import datetime
 
 
+# Records are enqueued on the calling thread and written to stdout by a
+# background listener, so request handlers never block on the stream write.
+_log_queue = queue.SimpleQueue()
+
+
+def _build_stream_handler() -> logging.Handler:
+    """Create the stdout handler that the queue listener writes through."""
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setLevel(logging.INFO)
+
+    # One shared formatter instance for every record; the format string is a
+    # fixed constant, so skip re-validating it
+    formatter = logging.Formatter(
+        fmt="%(asctime)s | %(levelname)-8s | %(name)s | %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+        validate=False
+    )
+    handler.setFormatter(formatter)
+    return handler
+
+
+_listener = logging.handlers.QueueListener(
+    _log_queue, _build_stream_handler(), respect_handler_level=True
+)
+_listener.start()
+atexit.register(_listener.stop)  # Drain queued records on shutdown
+
+
 def setup_logger(name: str = "resonate") -> logging.Logger:
     """
     Create a configured logger instance.
@@ -22,17 +53,10 @@ def setup_logger(name: str = "resonate") -> logging.Logger:
         return logger
     
     logger.setLevel(logging.INFO)
+    logger.propagate = False  # Don't hand records to root handlers a second time
     
-    # Console handler with formatting
-    handler = logging.StreamHandler(sys.stdout)
-    handler.setLevel(logging.INFO)
-    
-    formatter = logging.Formatter(
-        fmt="%(asctime)s | %(levelname)-8s | %(name)s | %(message)s",
-        datefmt="%Y-%m-%d %H:%M:%S"
-    )
-    handler.setFormatter(formatter)
-    logger.addHandler(handler)
+    # Non-blocking handler — formatting and I/O happen on the listener thread
+    logger.addHandler(logging.handlers.QueueHandler(_log_queue))
     
     return logger
 
@@ -43,22 +67,22 @@ logger = setup_logger()
 
 def log_request(endpoint: str, method: str = "POST") -> None:
     """Log incoming API request."""
-    logger.info(f"Request: {method} {endpoint}")
+    logger.info("Request: %s %s", method, endpoint)
 
 
 def log_response(endpoint: str, status: str, duration_ms: float = None) -> None:
     """Log API response with optional duration."""
-    msg = f"Response: {endpoint} -> {status}"
     if duration_ms:
-        msg += f" ({duration_ms:.0f}ms)"
-    logger.info(msg)
+        logger.info("Response: %s -> %s (%.0fms)", endpoint, status, duration_ms)
+    else:
+        logger.info("Response: %s -> %s", endpoint, status)
 
 
 def log_error(context: str, error: Exception) -> None:
     """Log error with context."""
-    logger.error(f"Error in {context}: {type(error).__name__}: {str(error)}")
+    logger.error("Error in %s: %s: %s", context, type(error).__name__, error)
 
 
 def log_ai_call(operation: str, model: str) -> None:
     """Log OpenAI API call."""
-    logger.info(f"AI Call: {operation} using {model}")
+    logger.info("AI Call: %s using %s", operation, model)
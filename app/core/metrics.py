@@ -0,0 +1,37 @@
+"""
+Prometheus metrics for AI usage and caching.
+
+Counters are per process. start.sh exports PROMETHEUS_MULTIPROC_DIR, so
+every gunicorn worker writes to it and /metrics (the instrumentator's
+endpoint) serves a MultiProcessCollector registry summed over all
+workers; gunicorn.conf.py's child_exit hook cleans up after dead workers.
+Without it (plain uvicorn), /metrics reports the single process.
+"""
+from prometheus_client import Counter
+
+
+# Tokens billed by OpenAI, split by provider-side prompt caching
+OPENAI_TOKENS = Counter(
+    "openai_tokens_total",
+    "Tokens reported by OpenAI responses",
+    ["kind", "cached"],
+)
+
+# Application-side cache lookups, by layer (exact, plan) and result (hit, miss)
+LLM_CACHE_LOOKUPS = Counter(
+    "llm_cache_lookups_total",
+    "Response cache lookups before calling OpenAI",
+    ["layer", "result"],
+)
+
+
+def record_usage(prompt_tokens: int, cached_tokens: int, completion_tokens: int) -> None:
+    """Count one response's token usage."""
+    OPENAI_TOKENS.labels("prompt", "yes").inc(cached_tokens)
+    OPENAI_TOKENS.labels("prompt", "no").inc(prompt_tokens - cached_tokens)
+    OPENAI_TOKENS.labels("completion", "no").inc(completion_tokens)
+
+
+def record_cache_lookup(layer: str, hit: bool) -> None:
+    """Count one cache lookup."""
+    LLM_CACHE_LOOKUPS.labels(layer, "hit" if hit else "miss").inc()
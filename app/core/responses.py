@@ -0,0 +1,39 @@
+"""
+JSON responses rendered with orjson, and pre-encoded JSON responses.
+"""
+from typing import Any
+
+import orjson
+from fastapi import Response
+
+
+class OrjsonResponse(Response):
+    """
+    Default response class: JSON bodies rendered with orjson.
+
+    A plain Response subclass rather than FastAPI's ORJSONResponse,
+    which is deprecated.
+    """
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+
+def success_response(field: str, payload: bytes) -> Response:
+    """
+    Wrap already-encoded JSON in the standard success envelope.
+
+    Splices the model's validated JSON bytes straight into
+    {"status": "success", "<field>": ...} instead of parsing
+    and re-serializing it.
+
+    Args:
+        field: Envelope key ("plan", "analysis")
+        payload: Validated JSON bytes from openai_service
+
+    Returns:
+        application/json Response
+    """
+    body = b'{"status":"success","' + field.encode("ascii") + b'":' + payload + b"}"
+    return Response(content=body, media_type="application/json")
@@ -3,17 +3,27 @@ Resonate Microservice - Main Entry Point
 
 AI-powered diagnostics parser and fitness/nutrition generator.
 """
+import asyncio
+import multiprocessing
 import os
-from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+import orjson
+import pybase64
+from fastapi import Depends, FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
+from slowapi.util import get_remote_address
+from prometheus_fastapi_instrumentator import Instrumentator
 
+from app.core.auth import verify_internal_secret
 from app.core.config import settings
 from app.core.logger import logger
-from app.core.limiter import limiter
+from app.core.limiter import limiter, PUBLIC_LIMIT
+from app.core.responses import OrjsonResponse
 from app.routes import parser, workout, nutrition, intervention
+from app.services import pdf_service, openai_service, llm_cache
 
 
 # Validate configuration on startup
@@ -21,15 +31,71 @@ try:
     settings.validate()
     logger.info("Configuration validated successfully")
 except ValueError as e:
-    logger.error(f"Configuration error: {e}")
+    logger.error("Configuration error: %s", e)
     raise
 
 
+# Snapshot required config once — env vars are fixed for the life of the worker.
+# A live re-check would not help: auth and the OpenAI client read these at import.
+_REQUIRED_CONFIG = ("OPENAI_API_KEY", "INTERNAL_API_SECRET")
+_MISSING_CONFIG = tuple(v for v in _REQUIRED_CONFIG if not os.environ.get(v))
+
+# Static response bodies, encoded once — health checks are polled constantly
+_ROOT_BYTES = orjson.dumps({"message": "Resonate Microservice running"})
+
+_HEALTHY_BYTES = orjson.dumps({
+    "status": "healthy",
+    "service": "resonate-microservice",
+    "version": "1.0.0"
+})
+
+_DEGRADED_BYTES = orjson.dumps({
+    "status": "degraded",
+    "service": "resonate-microservice",
+    "version": "1.0.0",
+    "missing_config": list(_MISSING_CONFIG),
+    "message": f"Missing required environment variables: {', '.join(_MISSING_CONFIG)}"
+})
+
+# Chosen once — /health does no per-request work beyond returning these bytes
+_HEALTH_BYTES = _DEGRADED_BYTES if _MISSING_CONFIG else _HEALTHY_BYTES
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create shared resources on startup and release them on shutdown."""
+    # Process pool for CPU-bound PDF rendering — sidesteps the GIL across concurrent requests.
+    # "spawn" keeps children from inheriting the event loop and logging threads of this worker.
+    app.state.render_pool = ProcessPoolExecutor(
+        max_workers=settings.PDF_RENDER_WORKERS,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=pdf_service.init_render_worker,
+    )
+    # Shared download client — keeps connections to storage/CDN hosts alive between requests
+    app.state.http = pdf_service.create_http_client()
+    # e.g. "1.4.0 (C extension active - AVX2)" — a scalar fallback means a missing wheel
+    logger.info("pybase64 %s", pybase64.get_version())
+    # Pay cold-start costs (worker spawn, PyMuPDF init, TLS handshake) before traffic arrives
+    await asyncio.gather(
+        pdf_service.warm_up_render_pool(app.state.render_pool),
+        openai_service.warm_up(),
+    )
+    yield
+    await app.state.http.aclose()
+    await openai_service.client.close()
+    await llm_cache.cache.close()
+    await llm_cache.report_cache.close()
+    await llm_cache.plan_cache.close()
+    app.state.render_pool.shutdown(wait=False, cancel_futures=True)
+
+
 # Create FastAPI app
 app = FastAPI(
     title="Resonate Microservice",
     description="AI-powered diagnostics parser and fitness/nutrition generator",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=OrjsonResponse,  # orjson for every route's JSON body
+    lifespan=lifespan
 )
 
 # Attach rate limiter and its error handler
@@ -57,12 +123,17 @@ app.include_router(workout.router, tags=["Workout"])
 app.include_router(nutrition.router, tags=["Nutrition"])
 app.include_router(intervention.router, tags=["Intervention"])
 
+# Request latency/count metrics plus the AI counters in app.core.metrics — internal callers only
+Instrumentator().instrument(app).expose(
+    app, include_in_schema=False, dependencies=[Depends(verify_internal_secret)]
+)
+
 
 @app.get("/")
-@limiter.limit("60/minute")
+@limiter.limit(PUBLIC_LIMIT, key_func=get_remote_address)
 def root(request: Request):
     """Health check endpoint."""
-    return {"message": "Resonate Microservice running"}
+    return Response(content=_ROOT_BYTES, media_type="application/json")
 
 
 @app.get("/health")
@@ -71,26 +142,7 @@ def health():
     Detailed health status.
     Returns 'degraded' if required environment variables are missing.
     """
-    required_vars = ["OPENAI_API_KEY", "INTERNAL_API_SECRET"]
-    missing = [v for v in required_vars if not os.environ.get(v)]
-
-    if missing:
-        return JSONResponse(
-            status_code=200,
-            content={
-                "status": "degraded",
-                "service": "resonate-microservice",
-                "version": "1.0.0",
-                "missing_config": missing,
-                "message": f"Missing required environment variables: {', '.join(missing)}"
-            }
-        )
-
-    return {
-        "status": "healthy",
-        "service": "resonate-microservice",
-        "version": "1.0.0"
-    }
+    return Response(content=_HEALTH_BYTES, media_type="application/json")
 
 
 # Run with uvicorn when executed directly
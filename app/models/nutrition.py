@@ -2,7 +2,7 @@
 Pydantic models for nutrition-related requests and responses.
 """
 from typing import Optional
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class NutritionRequest(BaseModel):
@@ -18,8 +18,9 @@ class NutritionRequest(BaseModel):
     cuisine: str = Field(default="Indian", description="Preferred cuisine type")
     memoryContext: Optional[dict] = Field(default={}, description="Memory context from Mem0")
 
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        extra="ignore",
+        json_schema_extra={
             "example": {
                 "age": 28,
                 "gender": "female",
@@ -31,6 +32,7 @@ class NutritionRequest(BaseModel):
                 "cuisine": "Indian"
             }
         }
+    )
 
 
 class MealItem(BaseModel):
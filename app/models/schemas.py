@@ -57,38 +57,6 @@ class WorkoutPlan(BaseModel):
     cooldown: list[ExerciseItem]
 
 
-# --- Nutrition Models ---
-
-class NutritionRequest(BaseModel):
-    """Request model for nutrition plan generation."""
-    age: int | None = None
-    gender: str | None = None
-    weight: float | None = None
-    height: float | None = None
-    goals: str | None = None
-    dietType: str | None = None
-    allergies: list[str] = []
-    cuisine: str = "Indian"
-
-
-class MealItem(BaseModel):
-    """Single meal in a nutrition plan."""
-    name: str
-    description: str
-    calories: int
-    protein: str
-
-
-class NutritionPlan(BaseModel):
-    """Generated nutrition plan."""
-    breakfast: MealItem
-    lunch: MealItem
-    dinner: MealItem
-    snacks: list[MealItem]
-    total_calories: int
-    total_protein: str
-
-
 # --- Food Analysis Models ---
 
 class FoodAnalysisRequest(BaseModel):
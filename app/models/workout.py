@@ -3,7 +3,7 @@ Pydantic models for workout-related requests and responses.
 Provides runtime validation and auto-documentation.
 """
 from typing import Optional
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class WorkoutRequest(BaseModel):
@@ -22,8 +22,9 @@ class WorkoutRequest(BaseModel):
     cyclePhase: Optional[str] = Field(None, description="Menstrual cycle phase (for females)")
     memoryContext: Optional[dict] = Field(default={}, description="Memory context from Mem0")
 
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        extra="ignore",
+        json_schema_extra={
             "example": {
                 "fitnessLevel": "intermediate",
                 "equipment": ["dumbbells", "resistance bands"],
@@ -33,6 +34,7 @@ class WorkoutRequest(BaseModel):
                 "workoutTiming": "morning"
             }
         }
+    )
 
 
 class ExerciseItem(BaseModel):
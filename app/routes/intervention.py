@@ -7,13 +7,14 @@ from app.models.schemas import InterventionRequest
 from app.services import openai_service
 from app.core.logger import log_request, log_error
 from app.core.auth import verify_internal_secret
-from app.core.limiter import limiter
+from app.core.circuit_breaker import CircuitOpenError
+from app.core.limiter import limiter, STANDARD_LIMIT, is_trusted_internal
 
 router = APIRouter(dependencies=[Depends(verify_internal_secret)])
 
 
 @router.post("/generate-interventions")
-@limiter.limit("10/minute")
+@limiter.limit(STANDARD_LIMIT, exempt_when=is_trusted_internal)
 async def generate_interventions(request: Request, req: InterventionRequest):
     """
     Suggest personalized health interventions based on memory context.
@@ -30,6 +31,8 @@ async def generate_interventions(request: Request, req: InterventionRequest):
             age=req.age,
         )
         return {"status": "success", "suggestions": result.get("suggestions", [])}
+    except CircuitOpenError:
+        raise HTTPException(status_code=503, detail="AI service temporarily unavailable")
     except ValueError as e:
         log_error("Intervention generation", e)
         raise HTTPException(status_code=500, detail="AI generation failed to produce valid JSON")
@@ -1,20 +1,23 @@
 """
 Nutrition and food analysis routes.
 """
+import asyncio
 from fastapi import APIRouter, HTTPException, Depends, Request
 
 from app.models.schemas import FoodAnalysisRequest
 from app.models.nutrition import NutritionRequest
 from app.services import pdf_service, openai_service
 from app.core.logger import log_request, log_error
+from app.core.responses import success_response
 from app.core.auth import verify_internal_secret
-from app.core.limiter import limiter
+from app.core.circuit_breaker import CircuitOpenError
+from app.core.limiter import limiter, STANDARD_LIMIT, EXPENSIVE_LIMIT, is_trusted_internal
 
 router = APIRouter(dependencies=[Depends(verify_internal_secret)])
 
 
 @router.post("/generate-nutrition")
-@limiter.limit("10/minute")
+@limiter.limit(STANDARD_LIMIT, exempt_when=is_trusted_internal)
 async def generate_nutrition(request: Request, req: NutritionRequest):
     """
     Generate personalized daily meal plan.
@@ -35,7 +38,9 @@ async def generate_nutrition(request: Request, req: NutritionRequest):
             allergies=req.allergies,
             cuisine=req.cuisine
         )
-        return {"status": "success", "plan": plan}
+        return success_response("plan", plan)
+    except CircuitOpenError:
+        raise HTTPException(status_code=503, detail="AI service temporarily unavailable")
     except ValueError as e:
         log_error("Nutrition generation", e)
         raise HTTPException(status_code=500, detail="AI generation failed to produce valid JSON")
@@ -45,7 +50,7 @@ async def generate_nutrition(request: Request, req: NutritionRequest):
 
 
 @router.post("/analyze-food")
-@limiter.limit("10/minute")
+@limiter.limit(EXPENSIVE_LIMIT, exempt_when=is_trusted_internal)
 async def analyze_food(request: Request, req: FoodAnalysisRequest):
     """
     Analyze food image for nutritional content.
@@ -55,18 +60,25 @@ async def analyze_food(request: Request, req: FoodAnalysisRequest):
     """
     log_request("/analyze-food")
 
-    # Download image
+    # Download image async (non-blocking) on the shared client
     try:
-        image_bytes = pdf_service.download_file(req.imageUrl)
-        image_base64 = pdf_service.image_to_base64(image_bytes)
+        image_bytes = await pdf_service.download_file(req.imageUrl, request.app.state.http)
+    except HTTPException:
+        raise  # Size / content-type rejections keep their original message
     except Exception as e:
         log_error("Image download", e)
         raise HTTPException(status_code=400, detail="Could not download or process image")
 
+    # Base64-encode off the event loop — food photos can be several MB
+    loop = asyncio.get_running_loop()
+    image_base64 = await loop.run_in_executor(None, pdf_service.image_to_base64, image_bytes)
+
     # Analyze with AI
     try:
         analysis = await openai_service.analyze_food_image(image_base64, req.cuisine)
-        return {"status": "success", "analysis": analysis}
+        return success_response("analysis", analysis)
+    except CircuitOpenError:
+        raise HTTPException(status_code=503, detail="AI service temporarily unavailable")
     except ValueError as e:
         log_error("Food analysis", e)
         raise HTTPException(status_code=500, detail="AI generation failed to produce valid JSON")
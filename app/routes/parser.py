@@ -2,64 +2,308 @@
 Blood report parsing routes.
 """
 import asyncio
+import hashlib
+import re
+from concurrent.futures import Executor
+from functools import lru_cache
+import orjson
 from fastapi import APIRouter, HTTPException, Depends, Request
+from starlette.datastructures import State
 
 from app.models.schemas import ParseRequest
-from app.services import pdf_service, openai_service
+from app.services import pdf_service, openai_service, llm_cache
 from app.core.logger import logger, log_request, log_error
 from app.core.auth import verify_internal_secret
-
-# Import the shared limiter from main app
-# Import the shared limiter from core
-from app.core.limiter import limiter
+from app.core.circuit_breaker import CircuitOpenError
+from app.core.config import settings
+from app.core.limiter import limiter, EXPENSIVE_LIMIT, is_trusted_internal
 
 router = APIRouter(dependencies=[Depends(verify_internal_secret)])
 
+# Canonical blood-panel terms — enough distinct hits on page 1 means we can skip classification
+_BIOMARKER_KEYWORDS_RE = re.compile(
+    r"\b(hemoglobin|haemoglobin|glucose|cholesterol|creatinine|wbc|rbc|platelets?)\b"
+)
+_MIN_KEYWORD_HITS = 3
 
-@router.post("/parse-report")
-@limiter.limit("5/minute")
-async def parse_report(request: Request, req: ParseRequest):
+# Classification used when the text layer already identifies a blood report
+_TEXT_CLASSIFICATION = {
+    "isBloodReport": True,
+    "confidence": "high",
+    "reason": "Blood panel terms found in document text"
+}
+
+
+def _looks_like_blood_report(text: str) -> bool:
+    """True if the text mentions at least _MIN_KEYWORD_HITS distinct blood-panel terms."""
+    return len(set(_BIOMARKER_KEYWORDS_RE.findall(text))) >= _MIN_KEYWORD_HITS
+
+
+# Grouped integer parts: Western "11,200" / "1,234,567" and Indian "2,50,000"
+_WESTERN_GROUPS_RE = re.compile(r"\d{1,3}(?:,\d{3})+")
+_INDIAN_GROUPS_RE = re.compile(r"\d{1,2}(?:,\d{2})*,\d{3}")
+
+# What may follow a number on its line without making it something else
+_RANGE_TAIL_RE = re.compile(r"\s*(?:[-–]|to\b)\s*\d", re.IGNORECASE)  # "13.0 - 17.0", "95 to 110"
+_EXPONENT_TAIL_RE = re.compile(r"[eE][-+]?\d")  # "1.5e2": not the whole number
+_DATE_TAIL_RE = re.compile(  # "12 Jan 2024": a day of the month
+    r"\s*(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?"
+    r"|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)\b",
+    re.IGNORECASE
+)
+_QUALIFIERS = frozenset("<>≤≥")  # "< 40": a bound, not a reading
+_SIGNS = frozenset("-+−.")  # Touching the number: "-2.1", "+2", ".9" — part of it, not a separator
+
+# Lab units ("g/dL", "cells/cumm", "%", "mmol", "x 10^3/µL", ...) — a number
+# followed by one is a measurement
+_UNIT = (
+    r"(?:%|(?:[a-zµμ]+|10\^?\d+)?/[a-zµμ]+"
+    r"|(?:[mµμunpfk]?(?:g|l|mol|iu|u|eq)|cells|fl|lakhs?|mill?ion|thou)\b|x\s*10\b)"
+)
+_UNIT_RE = re.compile(_UNIT, re.IGNORECASE)
+_MEASUREMENT_RE = re.compile(r"\d(?:\.\d+)?\s*" + _UNIT, re.IGNORECASE)
+
+# A reference range on a line of its own, e.g. "13.0 - 17.0"
+_RANGE_LINE_RE = re.compile(r"[\d.,]+\s*(?:[-–]|to\b)\s*\d", re.IGNORECASE)
+
+
+@lru_cache(maxsize=1024)
+def _biomarker_value_re(name: str) -> re.Pattern:
     """
-    Parse blood report PDF and extract biomarker values.
+    Pattern for "<name> <number><rest of line>" in normalised report text,
+    with the following line captured (not consumed) as "next".
 
-    - Downloads PDF from URL
-    - Classifies if it's a valid blood report
-    - Extracts requested biomarker values
+    The name must start its line, so "Hemoglobin A1c 5.6" never yields a
+    Hemoglobin reading and "LDL Cholesterol 130" is not Cholesterol. Only
+    punctuation and spaces (or one line break, for table cells) may sit
+    between it and the number. Whether the number is really the reading
+    is decided by _parse_reading.
+    """
+    return re.compile(
+        rf"^[^\w\n]*{re.escape(name)}(?!\w)(?P<gap>[^\w\n]*\n?[^\w\n]*?)"
+        r"(?P<number>\d+(?:,\d+)*(?:\.\d+)?)(?P<tail>[^\n]*)(?=(?:\n(?P<next>[^\n]*))?)",
+        re.IGNORECASE | re.MULTILINE
+    )
 
-    Rate limited to 5 requests/minute — each call costs real OpenAI money.
+
+def _parse_reading(match: re.Match) -> int | float | None:
     """
-    log_request("/parse-report")
+    Turn a _biomarker_value_re match into a value, or None to abstain.
 
-    # Validate biomarkers list
-    if not req.biomarkers:
-        raise HTTPException(
-            status_code=400,
-            detail="biomarkers list cannot be empty."
-        )
+    A number is only accepted when it ends at whitespace, the end of the
+    line or a unit ("13.5g/dL", "45%"). Signs and leading decimal points,
+    ranges (numeric or worded), dates, times, exponents, qualified bounds
+    ("< 40") and malformed digit grouping all abstain, so the report goes
+    to the model instead. A bare number alone on the line after the
+    name must be followed by its unit or reference range — otherwise it
+    may be the next row's serial number under an empty cell.
+    """
+    gap = match["gap"]
+    if _QUALIFIERS.intersection(gap) or (gap and gap[-1] in _SIGNS):
+        return None  # "< 40", "-2.1", ".9"
+
+    tail = match["tail"]
+    if tail and not (tail[0].isspace() or tail[0].isalpha() or tail[0] in "%µ"):
+        return None  # "12/03/2024", "7,500,", "10:30", "13.5.2"
+    if _RANGE_TAIL_RE.match(tail) or _EXPONENT_TAIL_RE.match(tail) or _DATE_TAIL_RE.match(tail):
+        return None
+
+    if "\n" in gap and not tail.strip():
+        following = match["next"]
+        if following is None or not (_UNIT_RE.match(following) or _RANGE_LINE_RE.match(following)):
+            return None  # "Hemoglobin\n2\nRBC 4.5": an empty cell, then the next row
+
+    integer, _, fraction = match["number"].partition(".")
+    if "," in integer:
+        if not (_WESTERN_GROUPS_RE.fullmatch(integer) or _INDIAN_GROUPS_RE.fullmatch(integer)):
+            return None  # "2,5" — a decimal comma or a list, not grouping
+        integer = integer.replace(",", "")
+    return float(f"{integer}.{fraction}") if fraction else int(integer)
+
+
+def _extract_locally(text: str, biomarkers: list[str]) -> dict | None:
+    """
+    Read biomarker values straight from a text layer, without AI.
+
+    Returns:
+        Values keyed by sanitized name, or None unless every requested
+        biomarker has exactly one distinct, clean reading in the text
+    """
+    extracted = {}
+    for bm in biomarkers:
+        readings = set()
+        for match in _biomarker_value_re(bm).finditer(text):
+            reading = _parse_reading(match)
+            if reading is None:
+                return None  # Looks like a value but isn't clean — leave it to the model
+            readings.add(reading)
+        if len(readings) != 1:
+            return None  # Missing or ambiguous — leave it to the model
+        extracted[openai_service.sanitize_key(bm)] = readings.pop()
+    return extracted
+
+
+# Names labs print for the same test — a results page may use any of them
+_BIOMARKER_ALIASES = (
+    frozenset({"tsh", "thyroid stimulating hormone", "thyrotropin"}),
+    frozenset({"hba1c", "a1c", "hemoglobin a1c", "haemoglobin a1c", "glycated hemoglobin",
+               "glycated haemoglobin", "glycosylated hemoglobin", "glycosylated haemoglobin"}),
+    frozenset({"hemoglobin", "haemoglobin", "hb", "hgb"}),
+    frozenset({"wbc", "white blood cells", "white blood cell count", "total leucocyte count",
+               "total leukocyte count", "tlc"}),
+    frozenset({"rbc", "red blood cells", "red blood cell count", "erythrocytes"}),
+    frozenset({"ldl", "ldl cholesterol", "low density lipoprotein"}),
+    frozenset({"hdl", "hdl cholesterol", "high density lipoprotein"}),
+    frozenset({"vitamin d", "25-oh vitamin d", "25 hydroxy vitamin d", "vitamin d3"}),
+    frozenset({"vitamin b12", "b12", "cobalamin", "cyanocobalamin"}),
+    frozenset({"alt", "sgpt", "alanine aminotransferase"}),
+    frozenset({"ast", "sgot", "aspartate aminotransferase"}),
+    frozenset({"inr", "international normalized ratio", "international normalised ratio"}),
+    frozenset({"crp", "c-reactive protein", "c reactive protein"}),
+    frozenset({"esr", "erythrocyte sedimentation rate"}),
+)
 
+
+@lru_cache(maxsize=256)
+def _page_terms_re(biomarkers: tuple[str, ...]) -> re.Pattern:
+    """Requested biomarker names plus their known aliases, as one word-bounded pattern."""
+    terms = {bm.lower() for bm in biomarkers}
+    for group in _BIOMARKER_ALIASES:
+        if terms & group:
+            terms |= group
+    alternatives = "|".join(re.escape(term) for term in sorted(terms, key=len, reverse=True))
+    return re.compile(rf"(?<!\w)(?:{alternatives})(?!\w)")
+
+
+def _pages_to_render(info: pdf_service.PdfInfo, biomarkers: list[str]) -> list[int]:
+    """
+    Pick the pages the vision model needs to see.
+
+    Pages without a trustworthy text layer are always rendered. Text-only
+    pages are rendered if they mention a requested biomarker (or a known
+    alias), a blood-panel term, or any number with a lab unit; covers,
+    disclaimers and method notes are skipped.
+
+    Returns:
+        0-based page numbers (every inspected page if none qualify)
+    """
+    terms = _page_terms_re(tuple(sorted(set(biomarkers))))
+    pages = [
+        page_num for page_num, text in enumerate(info.page_texts)
+        if text is None
+        or _BIOMARKER_KEYWORDS_RE.search(text)
+        or terms.search(text)
+        or _MEASUREMENT_RE.search(text)
+    ]
+    return pages or list(range(len(info.page_texts)))
+
+
+async def _extract_from_images(
+    pdf_bytes: bytes,
+    render_pool: Executor,
+    info: pdf_service.PdfInfo,
+    biomarkers: list[str]
+) -> tuple[dict, dict]:
+    """
+    Vision path for scanned reports: render pages, classify and extract.
+
+    Returns:
+        (classification, extracted values)
+    """
+    loop = asyncio.get_running_loop()
+
+    pages = _pages_to_render(info, biomarkers)
+    if len(pages) < len(info.page_texts):
+        logger.info("Rendering %d of %d pages (text-only pages without results skipped)", len(pages), len(info.page_texts))
+    images = await pdf_service.render_pdf(pdf_bytes, render_pool, pages)
+    # Encoding every page is measurable CPU — keep it off the event loop
+    full_content = await loop.run_in_executor(None, pdf_service.images_to_base64, images)
+
+    # OCR'd scans still name their tests in the text layer — enough to classify without AI
+    if _looks_like_blood_report(info.first_page_text):
+        logger.info("Blood report recognised from text layer, skipping AI classification")
+        return _TEXT_CLASSIFICATION, await openai_service.extract_biomarkers(full_content, biomarkers)
+
+    # Not recognised from text — one vision call both classifies and extracts
+    return await openai_service.classify_and_extract(full_content, biomarkers)
+
+
+def _report_cache_key(source: str, biomarkers: list[str]) -> str:
+    """
+    Cache key for a report result — biomarker order and duplicates don't matter.
+
+    Args:
+        source: "url:<pdfUrl>" or "sha256:<content digest>"
+        biomarkers: Requested biomarker names
+
+    Returns:
+        Hex digest, versioned so prompt changes invalidate old results
+    """
+    raw = f"{openai_service.PROMPT_VERSION}|{source}|" + ",".join(sorted(set(biomarkers)))
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _sha256_hex(data: bytes) -> str:
+    """Content digest of a downloaded file (run in an executor — files run to 20MB)."""
+    return hashlib.sha256(data).hexdigest()
+
+
+async def _analyse_report(app_state: State, pdf_url: str, biomarkers: list[str]) -> tuple[dict, dict]:
+    """
+    Download a report, check it is a blood report and extract biomarkers.
+
+    Returns:
+        (classification, extracted values keyed by sanitized name)
+
+    Raises:
+        HTTPException: On download failure, non-blood report or AI failure
+    """
     # Download PDF async (non-blocking) — includes file safety guards: 20MB limit, PDF content-type check
     try:
-        pdf_bytes = await pdf_service.download_file(req.pdfUrl)
+        pdf_bytes = await pdf_service.download_file(pdf_url, app_state.http)
     except HTTPException:
         raise  # Let our own HTTPExceptions (content-type, size) pass through with their original message
     except Exception as e:
         log_error("PDF download", e)
         raise HTTPException(status_code=400, detail="Could not download PDF")
 
-    loop = asyncio.get_event_loop()
+    loop = asyncio.get_running_loop()
 
-    # Get preview images for classification — run in thread pool (CPU-bound)
-    preview_images = await loop.run_in_executor(
-        None, lambda: pdf_service.pdf_to_images(pdf_bytes, max_pages=2)
-    )
-    preview_content = pdf_service.images_to_base64(preview_images)
+    # Same bytes under a new URL (re-uploads) — skip rendering and AI calls by content hash
+    digest = await loop.run_in_executor(None, _sha256_hex, pdf_bytes)
+    content_key = _report_cache_key(f"sha256:{digest}", biomarkers)
+    cached = await llm_cache.report_cache.get(content_key)
+    if cached is not None:
+        logger.info("Report content cache hit")
+        classification, extracted = orjson.loads(cached)
+        return classification, extracted
+
+    # One pass over the document: page 1 text, per-page text, and full text if text-native
+    info = await loop.run_in_executor(None, pdf_service.inspect_pdf, pdf_bytes)
 
-    # Classify document
     try:
-        classification = await openai_service.classify_blood_report(preview_content)
+        # Digital lab exports carry exact text — extract from it and skip rendering + vision
+        if info.native_text is not None and _looks_like_blood_report(info.native_text.lower()):
+            logger.info("Text-native blood report, extracting from text layer")
+            classification = _TEXT_CLASSIFICATION
+            extracted = None
+            if settings.LOCAL_EXTRACTION_ENABLED:
+                extracted = await loop.run_in_executor(None, _extract_locally, info.native_text, biomarkers)
+            if extracted is not None:
+                logger.info("All biomarkers read from text layer, skipping AI extraction")
+            else:
+                extracted = await openai_service.extract_biomarkers_from_text(info.native_text, biomarkers)
+        else:
+            classification, extracted = await _extract_from_images(
+                pdf_bytes, app_state.render_pool, info, biomarkers
+            )
+    except CircuitOpenError:
+        raise HTTPException(status_code=503, detail="AI service temporarily unavailable")
+    except HTTPException:
+        raise
     except Exception as e:
-        log_error("Document classification", e)
-        raise HTTPException(status_code=500, detail="Failed to classify report type")
+        log_error("Biomarker extraction", e)
+        raise HTTPException(status_code=500, detail="AI did not return valid JSON")
 
     if not classification.get("isBloodReport"):
         raise HTTPException(
@@ -67,29 +311,53 @@ async def parse_report(request: Request, req: ParseRequest):
             detail=f"Invalid report type. Reason: {classification.get('reason')}"
         )
 
-    # Convert full PDF for extraction — run in thread pool (CPU-bound)
-    full_images = await loop.run_in_executor(
-        None, lambda: pdf_service.pdf_to_images(pdf_bytes)
-    )
-    full_content = pdf_service.images_to_base64(full_images)
+    await llm_cache.report_cache.set(content_key, orjson.dumps([classification, extracted]))
+    return classification, extracted
 
-    # Extract biomarkers
-    try:
-        extracted = await openai_service.extract_biomarkers(full_content, req.biomarkers)
-    except Exception as e:
-        log_error("Biomarker extraction", e)
-        raise HTTPException(status_code=500, detail="AI did not return valid JSON")
 
-    # Build response with original biomarker names
+@router.post("/parse-report")
+@limiter.limit(EXPENSIVE_LIMIT, exempt_when=is_trusted_internal)
+async def parse_report(request: Request, req: ParseRequest):
+    """
+    Parse blood report PDF and extract biomarker values.
+
+    - Downloads PDF from URL
+    - Classifies if it's a valid blood report
+    - Extracts requested biomarker values
+
+    Rate limited to 5 requests/minute — each call costs real OpenAI money.
+    """
+    log_request("/parse-report")
+
+    # Validate biomarkers list
+    if not req.biomarkers:
+        raise HTTPException(
+            status_code=400,
+            detail="biomarkers list cannot be empty."
+        )
+
+    # Identical requests (retries, dashboard refreshes) reuse the earlier AI result
+    cache_key = _report_cache_key(f"url:{req.pdfUrl}", req.biomarkers)
+    cached = await llm_cache.report_cache.get(cache_key)
+    if cached is not None:
+        logger.info("Report cache hit")
+        classification, extracted = orjson.loads(cached)
+    else:
+        classification, extracted = await _analyse_report(request.app.state, req.pdfUrl, req.biomarkers)
+        await llm_cache.report_cache.set(cache_key, orjson.dumps([classification, extracted]))
+
+    # Build response with original biomarker names — single pass for values and missing
     final_values = {}
+    missing = []
     for bm in req.biomarkers:
-        key = openai_service.sanitize_key(bm)
-        value = extracted.get(key)
-        final_values[bm] = value if isinstance(value, (int, float)) else None
-
-    missing = [k for k, v in final_values.items() if v is None]
+        value = extracted.get(openai_service.sanitize_key(bm))
+        # bool is an int subclass — a stray true/false from the model is not a reading
+        if not isinstance(value, (int, float)) or isinstance(value, bool):
+            value = None
+            missing.append(bm)
+        final_values[bm] = value
 
-    logger.info(f"Extracted {len(req.biomarkers) - len(missing)}/{len(req.biomarkers)} biomarkers")
+    logger.info("Extracted %d/%d biomarkers", len(req.biomarkers) - len(missing), len(req.biomarkers))
 
     return {
         "confidence": classification.get("confidence"),
@@ -6,14 +6,16 @@ from fastapi import APIRouter, HTTPException, Depends, Request
 from app.models.schemas import WorkoutRequest
 from app.services import openai_service
 from app.core.logger import log_request, log_error
+from app.core.responses import success_response
 from app.core.auth import verify_internal_secret
-from app.core.limiter import limiter
+from app.core.circuit_breaker import CircuitOpenError
+from app.core.limiter import limiter, STANDARD_LIMIT, is_trusted_internal
 
 router = APIRouter(dependencies=[Depends(verify_internal_secret)])
 
 
 @router.post("/generate-workout")
-@limiter.limit("10/minute")
+@limiter.limit(STANDARD_LIMIT, exempt_when=is_trusted_internal)
 async def generate_workout(request: Request, req: WorkoutRequest):
     """
     Generate personalized AI workout plan.
@@ -37,7 +39,9 @@ async def generate_workout(request: Request, req: WorkoutRequest):
             weight=req.weight,
             cycle_phase=req.cyclePhase
         )
-        return {"status": "success", "plan": plan}
+        return success_response("plan", plan)
+    except CircuitOpenError:
+        raise HTTPException(status_code=503, detail="AI service temporarily unavailable")
     except ValueError as e:
         log_error("Workout generation", e)
         raise HTTPException(status_code=500, detail="AI generation failed to produce valid JSON")
@@ -0,0 +1,119 @@
+"""
+Exact-match response cache for deterministic LLM calls.
+
+Only temperature-0 calls (biomarker extraction) are cached by prompt —
+identical input is guaranteed to want the identical answer, so a hit
+skips the OpenAI round-trip and its token cost entirely. Workout and meal
+plans are opt-in and cached by profile instead (see plan_cache.guard_key).
+
+Backends:
+  - memory (default): per-worker TTL cache
+  - redis: shared across workers/replicas (uses REDIS_URL)
+  - none: caching disabled
+"""
+import hashlib
+from typing import Protocol
+
+import orjson
+import redis.asyncio as redis
+from cachetools import TTLCache
+
+from app.core.config import settings
+from app.core.logger import logger
+
+
+class CacheBackend(Protocol):
+    """Async key/value store for cached model responses (raw JSON bytes)."""
+
+    async def get(self, key: str) -> bytes | None: ...
+
+    async def set(self, key: str, value: bytes) -> None: ...
+
+    async def close(self) -> None: ...
+
+
+class NullCache:
+    """Backend used when caching is disabled — every lookup misses."""
+
+    async def get(self, key: str) -> bytes | None:
+        return None
+
+    async def set(self, key: str, value: bytes) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+
+class MemoryCache:
+    """In-process TTL cache — fast, but each worker keeps its own copy."""
+
+    def __init__(self, maxsize: int, ttl: int):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    async def get(self, key: str) -> bytes | None:
+        return self._cache.get(key)
+
+    async def set(self, key: str, value: bytes) -> None:
+        self._cache[key] = value
+
+    async def close(self) -> None:
+        self._cache.clear()
+
+
+class RedisCache:
+    """Redis-backed cache shared by every worker. Redis errors degrade to a miss."""
+
+    def __init__(self, url: str, ttl: int, prefix: str = "llm-cache:"):
+        self._redis = redis.from_url(url)
+        self._ttl = ttl
+        self._prefix = prefix
+
+    async def get(self, key: str) -> bytes | None:
+        try:
+            return await self._redis.get(self._prefix + key)
+        except redis.RedisError as e:
+            logger.warning("LLM cache read failed, treating as miss: %s", e)
+            return None
+
+    async def set(self, key: str, value: bytes) -> None:
+        try:
+            await self._redis.set(self._prefix + key, value, ex=self._ttl)
+        except redis.RedisError as e:
+            logger.warning("LLM cache write failed: %s", e)
+
+    async def close(self) -> None:
+        await self._redis.aclose()
+
+
+def make_key(payload: dict) -> str:
+    """
+    Build a cache key from everything that determines the model output.
+
+    Args:
+        payload: Model, messages and sampling parameters
+
+    Returns:
+        sha256 hex digest of the canonical JSON encoding
+    """
+    # Messages embed multi-MB base64 images — orjson serialises them far faster than json
+    encoded = orjson.dumps(payload, option=orjson.OPT_SORT_KEYS)
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def _build_backend(ttl: int, maxsize: int, prefix: str) -> CacheBackend:
+    """Select the backend from settings.LLM_CACHE_BACKEND."""
+    backend = settings.LLM_CACHE_BACKEND
+    if backend == "redis" and settings.REDIS_URL:
+        return RedisCache(settings.REDIS_URL, ttl=ttl, prefix=prefix)
+    if backend == "none":
+        return NullCache()
+    if backend == "redis":
+        logger.warning("LLM_CACHE_BACKEND=redis but REDIS_URL is not set, using memory cache")
+    return MemoryCache(maxsize=maxsize, ttl=ttl)
+
+
+# Global cache instances — model responses, whole /parse-report results, and plans
+cache = _build_backend(settings.LLM_CACHE_TTL, settings.LLM_CACHE_MAXSIZE, "llm-cache:")
+report_cache = _build_backend(settings.REPORT_CACHE_TTL, settings.REPORT_CACHE_MAXSIZE, "report-cache:")
+plan_cache = _build_backend(settings.PLAN_CACHE_TTL, settings.PLAN_CACHE_MAXSIZE, "plan-cache:")
@@ -1,61 +1,323 @@
 """
 OpenAI API service for AI operations.
 """
+import asyncio
 import json
 import re
+from functools import lru_cache, partial
+from typing import Awaitable, Callable
+import httpx
 import openai
+import orjson
 from openai import AsyncOpenAI
 from tenacity import (
     retry,
     stop_after_attempt,
-    wait_exponential,
+    wait_random_exponential,
     retry_if_exception_type,
     before_sleep_log,
 )
 import logging
 
+from app.core import metrics
+from app.core.circuit_breaker import CircuitBreaker, CircuitOpenError
 from app.core.config import settings
 from app.core.logger import logger, log_ai_call, log_error
+from app.services import llm_cache, plan_cache
 
 
-# Initialize OpenAI client
-client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
-
 # Per-call timeout: 10s to connect, 90s to receive response.
 # Prevents a stalled OpenAI stream from hanging a uvicorn worker forever.
 # The tenacity retry decorator will fire a new attempt if the timeout raises.
 OPENAI_TIMEOUT = openai.Timeout(90.0, connect=10.0)  # 90s default (read/write), 10s to connect
 
-# Tenacity retry policy: 3 total attempts, exponential backoff 2s→10s
-# Only retries transient errors: rate limits and connection failures
+# Hand-tuned transport: the SDK default pool is too small for parallel fan-out
+# (classification + extraction per report, many reports per worker). HTTP/2
+# multiplexes those requests over a few connections instead of one each.
+# With brotli installed httpx advertises "br" alongside gzip — JSON bodies compress well.
+_http_client = httpx.AsyncClient(
+    transport=httpx.AsyncHTTPTransport(
+        retries=0,
+        http2=True,
+        limits=httpx.Limits(
+            max_connections=200,
+            max_keepalive_connections=100,
+            keepalive_expiry=30.0,
+        ),
+    ),
+    timeout=OPENAI_TIMEOUT,
+)
+
+# Single shared client for the whole worker — every call reuses its connection pool.
+# SDK-level retries are off: _openai_retry below owns the retry policy, and stacking
+# both would multiply attempts (6 tenacity x 3 SDK) on every transient failure.
+# client.close() in the app lifespan also closes _http_client.
+client = AsyncOpenAI(
+    api_key=settings.OPENAI_API_KEY,
+    max_retries=0,
+    http_client=_http_client,
+)
+
+# Tenacity retry policy: 6 total attempts, full-jitter exponential backoff up to 60s.
+# Jitter spreads retries from concurrent requests so a 429 storm doesn't re-fire in sync.
+# Only retries transient errors: rate limits, connection failures, timeouts and 5xx.
 _openai_retry = retry(
-    stop=stop_after_attempt(3),
-    wait=wait_exponential(multiplier=1, min=2, max=10),
-    retry=retry_if_exception_type((openai.RateLimitError, openai.APIConnectionError)),
+    stop=stop_after_attempt(6),
+    wait=wait_random_exponential(multiplier=1, max=60),
+    retry=retry_if_exception_type((
+        openai.RateLimitError,
+        openai.APIConnectionError,  # Includes APITimeoutError
+        openai.InternalServerError,
+    )),
     before_sleep=before_sleep_log(logging.getLogger(__name__), logging.WARNING),
     reraise=True,
 )
 
+# Caps in-flight completions per worker so concurrent fan-out (classify + extract,
+# many reports at once) stays inside the provider's rate limits. Held per attempt,
+# so a request sleeping between retries doesn't block others.
+_openai_semaphore = asyncio.Semaphore(settings.OPENAI_MAX_CONCURRENCY)
+
+def _is_client_error(error: Exception) -> bool:
+    """True for 4xx responses (bad request, unknown model, 429, ...) — OpenAI is up."""
+    return isinstance(error, openai.APIStatusError) and error.status_code < 500
+
+
+# Opens after 5 consecutive failed attempts and rejects calls for 30s, so an
+# outage fails fast (503) instead of holding every worker through the retry budget.
+# Only timeouts, connection errors and 5xx count: any 4xx means OpenAI answered,
+# and 429s are backed off by tenacity — counting each retried attempt would
+# let one request open the circuit for everyone.
+openai_breaker = CircuitBreaker(
+    fail_max=5,
+    reset_timeout=30,
+    exclude=_is_client_error,
+)
+
+
+_JSON_DECODER = json.JSONDecoder()
+
+
+def _parse_json(content: str, context: str, raw: bool) -> dict | bytes:
+    """
+    Validate a model response as JSON.
+
+    Args:
+        content: Raw message content from the model
+        context: Label for error logging
+        raw: Return the validated JSON as UTF-8 bytes instead of a dict
+
+    JSON mode normally returns a bare object; if the model wraps it in
+    prose or a code fence, the first object is decoded in place with
+    raw_decode, which stops at its closing brace (no regex, and braces in
+    trailing prose don't matter).
+
+    Raises:
+        ValueError: If content is not valid JSON
+    """
+    try:
+        result = orjson.loads(content)
+    except orjson.JSONDecodeError as e:
+        start = content.find("{")
+        try:
+            if start == -1:
+                raise ValueError("no JSON object in response")
+            result, end = _JSON_DECODER.raw_decode(content, start)
+        except ValueError:
+            log_error(f"{context} JSON parsing", e)
+            raise ValueError("AI did not return valid JSON")
+        content = content[start:end]
+    # Validated — callers that only forward the JSON can skip re-serializing it
+    return content.encode("utf-8") if raw else result
+
+
+async def _sdk_completion(body: dict) -> tuple[str, int, int, int]:
+    """POST a chat completion through the SDK; returns (content, prompt, cached, completion tokens)."""
+    response = await client.chat.completions.create(
+        **body,
+        timeout=OPENAI_TIMEOUT,  # Hard cap: stalled responses won't hang the worker
+    )
+    content = response.choices[0].message.content
+    usage = response.usage
+    if usage is None:
+        return content, 0, 0, 0
+    details = usage.prompt_tokens_details
+    cached = (details.cached_tokens or 0) if details else 0
+    return content, usage.prompt_tokens, cached, usage.completion_tokens
+
+
+# Raw-HTTP path: same endpoint, skipping the SDK's request building and pydantic parsing
+_COMPLETIONS_URL = str(client.base_url).rstrip("/") + "/chat/completions"
+_RAW_HEADERS = {
+    "Authorization": f"Bearer {settings.OPENAI_API_KEY}",
+    "Content-Type": "application/json",
+}
+
+# Status code → SDK exception, so retry and circuit-breaker rules apply unchanged
+_STATUS_ERRORS = {
+    400: openai.BadRequestError,
+    401: openai.AuthenticationError,
+    403: openai.PermissionDeniedError,
+    404: openai.NotFoundError,
+    409: openai.ConflictError,
+    422: openai.UnprocessableEntityError,
+    429: openai.RateLimitError,
+}
+
+
+def _status_error(response: httpx.Response) -> openai.APIStatusError:
+    """Build the SDK exception the client would have raised for this error response."""
+    try:
+        body = orjson.loads(response.content)
+    except orjson.JSONDecodeError:
+        body = None
+    error = body.get("error") if isinstance(body, dict) else None
+    message = error.get("message") if isinstance(error, dict) else None
+    message = message or f"Error code: {response.status_code}"
+
+    if response.status_code >= 500:
+        error_cls = openai.InternalServerError
+    else:
+        error_cls = _STATUS_ERRORS.get(response.status_code, openai.APIStatusError)
+    return error_cls(message, response=response, body=body)
+
+
+async def _raw_completion(body: dict) -> tuple[str, int, int, int]:
+    """POST a chat completion directly on the shared pool; returns (content, prompt, cached, completion tokens)."""
+    try:
+        response = await _http_client.post(_COMPLETIONS_URL, content=orjson.dumps(body), headers=_RAW_HEADERS)
+    except httpx.TimeoutException as e:
+        raise openai.APITimeoutError(request=e.request) from e
+    except httpx.TransportError as e:
+        raise openai.APIConnectionError(request=e.request) from e
+
+    if response.is_error:
+        raise _status_error(response)
+
+    data = orjson.loads(response.content)
+    usage = data.get("usage") or {}
+    cached = (usage.get("prompt_tokens_details") or {}).get("cached_tokens") or 0
+    return (
+        data["choices"][0]["message"]["content"],
+        usage.get("prompt_tokens", 0),
+        cached,
+        usage.get("completion_tokens", 0),
+    )
+
 
 @_openai_retry
+async def _create_completion(messages: list[dict], temperature: float) -> str:
+    """Send one JSON-mode chat completion request and return the message content."""
+    body = {
+        "model": settings.OPENAI_MODEL,
+        "messages": messages,
+        "temperature": temperature,
+        "response_format": {"type": "json_object"},
+    }
+    send = _raw_completion if settings.USE_RAW_HTTP else _sdk_completion
+    async with _openai_semaphore:
+        content, prompt_tokens, cached_tokens, completion_tokens = await openai_breaker.call(send, body)
+    logger.debug(
+        "Tokens: prompt %d (cached %d), completion %d",
+        prompt_tokens, cached_tokens, completion_tokens
+    )
+    metrics.record_usage(prompt_tokens, cached_tokens, completion_tokens)
+    return content
+
+
+async def warm_up() -> None:
+    """
+    Open a pooled connection to OpenAI before the first request.
+
+    A cheap models.list() call does the TLS / HTTP/2 handshake up front.
+    Failure is logged and ignored — startup must not depend on OpenAI.
+    """
+    try:
+        await client.models.list(timeout=5.0)
+        logger.info("OpenAI connection warmed up")
+    except openai.OpenAIError as e:
+        logger.warning("OpenAI warm-up failed, continuing: %s", e)
+
+
+# Deterministic calls currently awaiting OpenAI, by cache key (single-flight)
+_in_flight: dict[str, asyncio.Future] = {}
+
+
+def _release_in_flight(cache_key: str, call: asyncio.Future) -> None:
+    """Done-callback for a shared call: unregister it and retrieve its outcome."""
+    _in_flight.pop(cache_key, None)
+    if not call.cancelled():
+        call.exception()  # Every waiter may have gone — don't log "never retrieved"
+
+
+async def _complete_json(
+    messages: list[dict],
+    temperature: float,
+    context: str,
+    raw: bool
+) -> dict | bytes:
+    """
+    Run a completion through the response cache and validate the JSON.
+
+    Deterministic (temperature 0) calls are served from llm_cache when
+    the exact same model + messages were answered before. Identical
+    calls that arrive while one is still running wait for it instead of
+    going upstream again.
+    """
+    cache_key = None
+    if temperature == 0:
+        cache_key = llm_cache.make_key({
+            "model": settings.OPENAI_MODEL,
+            "messages": messages,
+            "temperature": temperature,
+        })
+        cached = await llm_cache.cache.get(cache_key)
+        metrics.record_cache_lookup("exact", cached is not None)
+        if cached is not None:
+            logger.info("%s cache hit", context)
+            return _parse_json(cached.decode("utf-8"), context, raw)
+
+        pending = _in_flight.get(cache_key)
+        if pending is not None:
+            logger.info("%s joined an identical in-flight call", context)
+            # Shielded: one waiter giving up must not cancel the others' call
+            return _parse_json(await asyncio.shield(pending), context, raw)
+
+        pending = asyncio.ensure_future(_create_completion(messages, temperature))
+        _in_flight[cache_key] = pending
+        pending.add_done_callback(partial(_release_in_flight, cache_key))
+        content = await asyncio.shield(pending)
+    else:
+        content = await _create_completion(messages, temperature)
+    result = _parse_json(content, context, raw)
+    logger.info("%s call successful", context)
+
+    if cache_key is not None:
+        await llm_cache.cache.set(cache_key, content.encode("utf-8"))
+    return result
+
+
 async def call_vision_api(
     prompt: str,
     image_content: list[dict],
-    temperature: float = 0.0
-) -> dict:
+    temperature: float = 0.0,
+    raw: bool = False
+) -> dict | bytes:
     """
     Call OpenAI Vision API with images.
 
-    Retries automatically on RateLimitError / APIConnectionError
-    (up to 3 attempts with exponential backoff).
+    Retries automatically on rate limits, connection errors, timeouts
+    and 5xx responses (up to 6 attempts with jittered backoff). Temperature-0 calls
+    are answered from the response cache when possible.
 
     Args:
         prompt: Text prompt for the model
         image_content: List of image content dicts
         temperature: Model temperature
+        raw: Return the validated JSON bytes instead of parsing to a dict
 
     Returns:
-        Parsed JSON response
+        Parsed JSON response (JSON bytes if raw=True)
 
     Raises:
         ValueError: If response is not valid JSON
@@ -71,42 +333,30 @@ async def call_vision_api(
         ]
     }]
 
-    response = await client.chat.completions.create(
-        model=settings.OPENAI_MODEL,
-        messages=messages,
-        temperature=temperature,
-        response_format={"type": "json_object"},
-        timeout=OPENAI_TIMEOUT,  # Hard cap: stalled responses won't hang the worker
-    )
-
-    try:
-        result = json.loads(response.choices[0].message.content)
-        logger.info("Vision API call successful")
-        return result
-    except json.JSONDecodeError as e:
-        log_error("Vision API JSON parsing", e)
-        raise ValueError("AI did not return valid JSON")
+    return await _complete_json(messages, temperature, "Vision API", raw)
 
 
-@_openai_retry
 async def call_chat_api(
     system_prompt: str,
     user_prompt: str,
-    temperature: float = 0.7
-) -> dict:
+    temperature: float = 0.7,
+    raw: bool = False
+) -> dict | bytes:
     """
     Call OpenAI Chat API for text generation.
 
-    Retries automatically on RateLimitError / APIConnectionError
-    (up to 3 attempts with exponential backoff).
+    Retries automatically on rate limits, connection errors, timeouts
+    and 5xx responses (up to 6 attempts with jittered backoff). Temperature-0 calls
+    are answered from the response cache when possible.
 
     Args:
         system_prompt: System context
         user_prompt: User request
         temperature: Model temperature
+        raw: Return the validated JSON bytes instead of parsing to a dict
 
     Returns:
-        Parsed JSON response
+        Parsed JSON response (JSON bytes if raw=True)
 
     Raises:
         ValueError: If response is not valid JSON
@@ -119,26 +369,50 @@ async def call_chat_api(
         {"role": "user", "content": user_prompt}
     ]
 
-    response = await client.chat.completions.create(
-        model=settings.OPENAI_MODEL,
-        messages=messages,
-        temperature=temperature,
-        response_format={"type": "json_object"},
-        timeout=OPENAI_TIMEOUT,  # Hard cap: stalled responses won't hang the worker
-    )
+    return await _complete_json(messages, temperature, "Chat API", raw)
 
-    try:
-        result = json.loads(response.choices[0].message.content)
-        logger.info("Chat API call successful")
-        return result
-    except json.JSONDecodeError as e:
-        log_error("Chat API JSON parsing", e)
-        raise ValueError("AI did not return valid JSON")
 
+async def _generate_with_plan_cache(
+    namespace: str,
+    guard: tuple,
+    generate: Callable[[], Awaitable[bytes]]
+) -> bytes:
+    """
+    Reuse a plan generated for a matching profile, else generate one.
+
+    Args:
+        namespace: Generator name, keeps workout and meal plans apart
+        guard: Every profile field that changes the plan (injuries,
+            allergies, goals, numeric bands, ...)
+        generate: Zero-arg coroutine factory that calls the model
 
+    Returns:
+        Plan as validated JSON bytes
+    """
+    if not settings.PLAN_CACHE_ENABLED:
+        return await generate()
+
+    key = plan_cache.guard_key(namespace, *guard)
+    cached = await llm_cache.plan_cache.get(key)
+    metrics.record_cache_lookup("plan", cached is not None)
+    if cached is not None:
+        logger.info("Plan cache hit for %s", namespace)
+        return cached
+
+    result = await generate()
+    await llm_cache.plan_cache.set(key, result)
+    return result
+
+
+_SANITIZE_RE = re.compile(r'[^a-zA-Z0-9\s]')
+
+
+@lru_cache(maxsize=1024)
 def sanitize_key(name: str) -> str:
     """
     Convert biomarker name to valid JSON key.
+
+    Memoized — biomarker names repeat across requests.
     
     Args:
         name: Biomarker display name
@@ -146,7 +420,7 @@ def sanitize_key(name: str) -> str:
     Returns:
         camelCase key string
     """
-    cleaned = re.sub(r'[^a-zA-Z0-9\s]', '', name.lower())
+    cleaned = _SANITIZE_RE.sub('', name.lower())
     words = cleaned.split()
     if not words:
         return "biomarker"
@@ -155,73 +429,144 @@ def sanitize_key(name: str) -> str:
 
 # --- Blood Report Classification ---
 
-CLASSIFICATION_PROMPT = """
-You are a medical document classifier.
+# Bump when classification/extraction prompts change — invalidates cached report results
+PROMPT_VERSION = "v2"
 
-Based ONLY on the document content,
-determine whether this is a BLOOD TEST REPORT.
+# Invariant part of the extraction prompt. Kept ahead of the per-request
+# biomarker list so OpenAI's automatic prompt caching can reuse the prefix.
+EXTRACTION_STATIC_PREAMBLE = """
+Extract ONLY the biomarkers listed at the end of this message from the blood report.
 
-Return JSON only:
+STRICT RULES:
+- Extract the EXACT numeric value ONLY if explicitly written.
+- If missing or unclear, return null.
+- Do NOT infer or calculate.
+- Do NOT apply medical knowledge.
+- Match biomarker names flexibly.
+
+Return JSON ONLY matching the schema given below.
+"""
+
+# Classification and extraction in one call — the page images are sent (and billed) once
+CLASSIFY_AND_EXTRACT_PREAMBLE = """
+You are a medical document classifier and data extractor.
+
+First decide, based ONLY on the document content, whether this is a BLOOD TEST REPORT.
+Then extract ONLY the biomarkers listed at the end of this message.
+
+STRICT RULES:
+- Extract the EXACT numeric value ONLY if explicitly written.
+- If missing or unclear, return null.
+- Do NOT infer or calculate.
+- Do NOT apply medical knowledge.
+- Match biomarker names flexibly.
+- If this is NOT a blood test report, return null for every biomarker.
+
+Return JSON ONLY with this structure:
 {
   "isBloodReport": true | false,
   "confidence": "low" | "medium" | "high",
-  "reason": "short explanation"
+  "reason": "short explanation",
+  "values": <object matching the schema given below>
 }
 """
 
 
-async def classify_blood_report(image_content: list[dict]) -> dict:
+@lru_cache(maxsize=64)
+def _build_extraction_prompt(biomarkers: tuple[str, ...], preamble: str) -> str:
+    """Render the extraction prompt — callers send the same panels over and over."""
+    biomarker_list = "\n".join(f"- {bm}" for bm in biomarkers)
+    json_schema = {sanitize_key(bm): None for bm in biomarkers}
+
+    # Static instructions first, request-specific values last
+    return f"""{preamble}
+Biomarkers to extract:
+{biomarker_list}
+
+Schema:
+{orjson.dumps(json_schema, option=orjson.OPT_INDENT_2).decode()}
+"""
+
+
+def _extraction_prompt(biomarkers: list[str], preamble: str = EXTRACTION_STATIC_PREAMBLE) -> str:
     """
-    Classify if document is a blood report.
+    Extraction prompt for a biomarker list, in canonical form.
+
+    Values are matched back by sanitized key, so order and duplicates
+    don't matter; sorting and de-duplicating lets the same panel in any
+    order share one prompt-cache entry (and one llm_cache entry).
+    """
+    return _build_extraction_prompt(tuple(sorted(set(biomarkers))), preamble)
+
+
+async def extract_biomarkers(image_content: list[dict], biomarkers: list[str]) -> dict:
+    """
+    Extract biomarker values from blood report images.
     
     Args:
-        image_content: Document page images
+        image_content: Report page images
+        biomarkers: List of biomarker names to extract
         
     Returns:
-        Classification result with confidence
+        Dict mapping biomarker names to values
     """
     return await call_vision_api(
-        CLASSIFICATION_PROMPT,
+        _extraction_prompt(biomarkers),
         image_content,
         temperature=settings.TEMPERATURE_EXTRACTION
     )
 
 
-async def extract_biomarkers(image_content: list[dict], biomarkers: list[str]) -> dict:
+async def extract_biomarkers_from_text(report_text: str, biomarkers: list[str]) -> dict:
     """
-    Extract biomarker values from blood report images.
-    
+    Extract biomarker values from a text-native report's text layer.
+
+    Same prompt as the vision path, sent as the system message to the
+    cheaper text-only chat call.
+
     Args:
-        image_content: Report page images
+        report_text: Text extracted from the PDF
         biomarkers: List of biomarker names to extract
-        
+
     Returns:
         Dict mapping biomarker names to values
     """
-    biomarker_list = "\n".join([f"- {bm}" for bm in biomarkers])
-    json_schema = {sanitize_key(bm): None for bm in biomarkers}
+    return await call_chat_api(
+        _extraction_prompt(biomarkers),
+        f"Blood report text:\n\n{report_text}",
+        temperature=settings.TEMPERATURE_EXTRACTION
+    )
 
-    prompt = f"""
-Extract ONLY these biomarkers from the blood report:
 
-{biomarker_list}
+async def classify_and_extract(image_content: list[dict], biomarkers: list[str]) -> tuple[dict, dict]:
+    """
+    Classify the document and extract biomarkers in a single vision call.
 
-STRICT RULES:
-- Extract the EXACT numeric value ONLY if explicitly written.
-- If missing or unclear, return null.
-- Do NOT infer or calculate.
-- Do NOT apply medical knowledge.
-- Match biomarker names flexibly.
+    One request instead of two: the page images are uploaded and billed
+    once, and there is a single round-trip.
 
-Return JSON ONLY matching this schema:
-{json.dumps(json_schema, indent=2)}
-"""
+    Args:
+        image_content: Report page images
+        biomarkers: List of biomarker names to extract
 
-    return await call_vision_api(
-        prompt,
+    Returns:
+        (classification, extracted values) — extracted is {} when the
+        document is not a blood report
+    """
+    result = await call_vision_api(
+        _extraction_prompt(biomarkers, CLASSIFY_AND_EXTRACT_PREAMBLE),
         image_content,
         temperature=settings.TEMPERATURE_EXTRACTION
     )
+    classification = {
+        "isBloodReport": result.get("isBloodReport"),
+        "confidence": result.get("confidence"),
+        "reason": result.get("reason"),
+    }
+    values = result.get("values")
+    if not classification["isBloodReport"] or not isinstance(values, dict):
+        return classification, {}
+    return classification, values
 
 
 # --- Workout Generation ---
@@ -268,12 +613,12 @@ async def generate_workout(
     gender: str = None,
     weight: float = None,
     cycle_phase: str = None
-) -> dict:
+) -> bytes:
     """
     Generate personalized workout plan.
     
     Returns:
-        Workout plan dict
+        Workout plan as validated JSON bytes
     """
     profile_desc = f"Fitness Level: {level}\nTime Available: {time} minutes\n"
     
@@ -301,12 +646,23 @@ async def generate_workout(
         profile_desc += f"Menstrual Cycle Phase: {cycle_phase}\n"
 
     user_prompt = f"Create a workout for this user:\n{profile_desc}"
-    
-    return await call_chat_api(
-        WORKOUT_SYSTEM_PROMPT,
-        user_prompt,
-        temperature=settings.TEMPERATURE_CREATIVE
+
+    async def generate() -> bytes:
+        return await call_chat_api(
+            WORKOUT_SYSTEM_PROMPT,
+            user_prompt,
+            temperature=settings.TEMPERATURE_CREATIVE,
+            raw=True
+        )
+
+    # Every field in the prompt must match; numbers only by band
+    guard = (
+        level, time, equipment, injuries or [], gender, cycle_phase,
+        motivation, timing, barriers or [],
+        plan_cache.numeric_band(age, plan_cache.AGE_BAND_YEARS),
+        plan_cache.numeric_band(weight, plan_cache.WEIGHT_BAND_KG),
     )
+    return await _generate_with_plan_cache("workout", guard, generate)
 
 
 # --- Nutrition Generation ---
@@ -320,12 +676,12 @@ async def generate_meal_plan(
     diet_type: str = None,
     allergies: list[str] = None,
     cuisine: str = "Indian"
-) -> dict:
+) -> bytes:
     """
     Generate daily meal plan.
     
     Returns:
-        Meal plan dict
+        Meal plan as validated JSON bytes
     """
     allergies_str = ", ".join(allergies) if allergies else "None"
     
@@ -363,16 +719,27 @@ Return JSON ONLY with this structure:
 }}
 """
 
-    return await call_chat_api(
-        "You are a helpful nutrition assistant that outputs strictly valid JSON.",
-        prompt,
-        temperature=settings.TEMPERATURE_CREATIVE
+    async def generate() -> bytes:
+        return await call_chat_api(
+            "You are a helpful nutrition assistant that outputs strictly valid JSON.",
+            prompt,
+            temperature=settings.TEMPERATURE_CREATIVE,
+            raw=True
+        )
+
+    # Every field in the prompt must match; numbers only by band
+    guard = (
+        diet_type, allergies or [], cuisine, gender, goals,
+        plan_cache.numeric_band(age, plan_cache.AGE_BAND_YEARS),
+        plan_cache.numeric_band(weight, plan_cache.WEIGHT_BAND_KG),
+        plan_cache.numeric_band(height, plan_cache.HEIGHT_BAND_CM),
     )
+    return await _generate_with_plan_cache("meal_plan", guard, generate)
 
 
 # --- Food Analysis ---
 
-async def analyze_food_image(image_base64: str, cuisine: str = "General") -> dict:
+async def analyze_food_image(image_base64: str, cuisine: str = "General") -> bytes:
     """
     Analyze food image for nutritional content.
     
@@ -381,11 +748,11 @@ async def analyze_food_image(image_base64: str, cuisine: str = "General") -> dic
         cuisine: Cuisine context hint
         
     Returns:
-        Food analysis dict
+        Food analysis as validated JSON bytes
     """
     prompt = f"""
 You are an expert nutritionist and food analyst. 
-Analyze the food in this image. The user specified the cuisine/context as: {cuisine}.
+Analyze the food in this image.
 
 Identify the food items, estimate portion sizes, and calculate nutritional values.
 
@@ -404,6 +771,8 @@ Return JSON ONLY with this structure:
   "health_rating": "A score from 1-10 (10 being very healthy)",
   "suggestions": "Suggestions to make it healthier or what to pair it with"
 }}
+
+The user specified the cuisine/context as: {cuisine}.
 """
 
     image_content = [{
@@ -414,7 +783,8 @@ Return JSON ONLY with this structure:
     return await call_vision_api(
         prompt,
         image_content,
-        temperature=settings.TEMPERATURE_ANALYSIS
+        temperature=settings.TEMPERATURE_ANALYSIS,
+        raw=True
     )
 
 
@@ -1,10 +1,15 @@
 """
 PDF processing service - download, convert to images.
 """
-import io
-import base64
+import asyncio
+import re
+import signal
+from concurrent.futures import Executor
+from typing import NamedTuple
+
 import httpx
-from PIL import Image
+import pybase64
+from cachetools import TTLCache
 import fitz  # PyMuPDF
 
 from app.core.config import settings
@@ -14,8 +19,45 @@ from app.core.logger import logger, log_error
 # Maximum pages to render per PDF — prevents OOM under concurrent load
 MAX_PAGES = 10
 
+JPEG_DATA_URL_PREFIX = "data:image/jpeg;base64,"
+
+# Text-native detection — below this much text, or above this much page
+# area covered by images, a PDF goes through the vision path instead
+MIN_NATIVE_TEXT_CHARS = 500
+MAX_NATIVE_IMAGE_COVERAGE = 0.5
+
+# Runs of spaces/tabs (incl. non-breaking) inside a line of extracted text
+_INLINE_SPACE_RE = re.compile(r"[ \t\u00a0]+")
+
+# Recently downloaded files by URL — retries and re-submits of the same report
+# skip the network. Bounded by total bytes, not entry count (files run to 20MB).
+_download_cache: TTLCache = TTLCache(
+    maxsize=settings.DOWNLOAD_CACHE_MAX_BYTES,
+    ttl=settings.DOWNLOAD_CACHE_TTL,
+    getsizeof=len,
+)
+
+
+def create_http_client() -> httpx.AsyncClient:
+    """
+    Create the shared async HTTP client used for file downloads.
+
+    Built once in the app lifespan and reused across requests so
+    connections to blob storage / CDN hosts are kept alive. HTTP/2 is
+    negotiated where the host supports it, so concurrent downloads from
+    one CDN share a single connection.
+    """
+    return httpx.AsyncClient(
+        timeout=settings.PDF_DOWNLOAD_TIMEOUT,
+        transport=httpx.AsyncHTTPTransport(
+            http2=True,
+            retries=1,  # Retries connect failures only — never a half-read body
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+        ),
+    )
+
 
-async def download_file(url: str) -> bytes:
+async def download_file(url: str, client: httpx.AsyncClient) -> bytearray:
     """
     Download a file from URL with safety guards (async).
 
@@ -25,9 +67,10 @@ async def download_file(url: str) -> bytes:
 
     Args:
         url: URL to download from
+        client: Shared client from create_http_client()
 
     Returns:
-        File content as bytes
+        File content (a bytearray — PyMuPDF and pybase64 take it as-is)
 
     Raises:
         HTTPException: If file is too large or wrong content type
@@ -37,127 +80,293 @@ async def download_file(url: str) -> bytes:
 
     MAX_SIZE_BYTES = 20 * 1024 * 1024  # 20 MB
 
-    async with httpx.AsyncClient(timeout=settings.PDF_DOWNLOAD_TIMEOUT) as client:
-        # HEAD request first — check size and content-type before downloading
-        try:
-            head = await client.head(url, follow_redirects=True)
-            head.raise_for_status()
-        except httpx.HTTPError as e:
-            logger.warning(f"HEAD request failed for URL, proceeding with GET: {e}")
-            head = None
-
-        if head is not None:
-            content_length = head.headers.get("content-length")
-            if content_length and int(content_length) > MAX_SIZE_BYTES:
+    cached = _download_cache.get(url)
+    if cached is not None:
+        logger.info("Download cache hit (%d bytes)", len(cached))
+        return cached
+
+    logger.info("Downloading file from: %.80s...", url)
+
+    # Stream download straight into one buffer — enforce size limit during transfer
+    async with client.stream("GET", url, follow_redirects=True) as response:
+        logger.info(
+            "GET response status: %s, content-type: %s",
+            response.status_code, response.headers.get("content-type", "unknown")
+        )
+        response.raise_for_status()
+
+        # Headers arrive before the body — reject oversized / non-document responses
+        # without a separate HEAD round-trip and before reading a single chunk
+        content_length = response.headers.get("content-length", "")
+        if content_length.isdigit() and int(content_length) > MAX_SIZE_BYTES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"File too large: {int(content_length) // (1024*1024)}MB exceeds 20MB limit."
+            )
+
+        content_type = response.headers.get("content-type", "")
+        # Only reject clearly non-document types (HTML pages, JSON, plain text).
+        # Cloudinary may serve PDFs as "image/jpeg", "application/pdf", or
+        # "application/octet-stream" depending on the resource_type used at upload.
+        clearly_wrong = any(t in content_type.lower() for t in ["text/html", "application/json", "text/plain"])
+        if content_type and clearly_wrong:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid file type: expected PDF, got '{content_type}'."
+            )
+
+        # Preallocate from Content-Length so chunks are written in place (no join copy).
+        # The header is only a hint: slice assignment past the end still grows the buffer.
+        content = bytearray(int(content_length) if content_length.isdigit() else 0)
+        total = 0
+        async for chunk in response.aiter_bytes(chunk_size=65536):
+            end = total + len(chunk)
+            if end > MAX_SIZE_BYTES:
                 raise HTTPException(
                     status_code=400,
-                    detail=f"File too large: {int(content_length) // (1024*1024)}MB exceeds 20MB limit."
+                    detail="File too large: exceeds 20MB limit."
                 )
+            content[total:end] = chunk
+            total = end
+        del content[total:]  # Body shorter than the hint
 
-            content_type = head.headers.get("content-type", "")
-            logger.info(f"Content-Type from HEAD: '{content_type}'")
-            # Only reject clearly non-document types (HTML pages, JSON, plain text).
-            # Cloudinary may serve PDFs as "image/jpeg", "application/pdf", or
-            # "application/octet-stream" depending on the resource_type used at upload.
-            clearly_wrong = any(t in content_type.lower() for t in ["text/html", "application/json", "text/plain"])
-            if content_type and clearly_wrong:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Invalid file type: expected PDF, got '{content_type}'."
-                )
+    logger.info("Downloaded %d bytes", total)
+    _download_cache[url] = content
+    return content
 
-        logger.info(f"Downloading file from: {url[:80]}...")
 
-        # Stream download — enforce size limit during transfer
-        chunks = []
-        total = 0
-        async with client.stream("GET", url, follow_redirects=True) as response:
-            logger.info(f"GET response status: {response.status_code}, content-type: {response.headers.get('content-type', 'unknown')}")
-            response.raise_for_status()
-            async for chunk in response.aiter_bytes(chunk_size=65536):
-                total += len(chunk)
-                if total > MAX_SIZE_BYTES:
-                    raise HTTPException(
-                        status_code=400,
-                        detail="File too large: exceeds 20MB limit."
-                    )
-                chunks.append(chunk)
-
-    content = b"".join(chunks)
-    logger.info(f"Downloaded {len(content)} bytes")
-    return content
+def init_render_worker() -> None:
+    """
+    Initializer for render pool processes.
 
+    Runs once per worker. Unpickling it imports this module (and
+    PyMuPDF) up front instead of inside the first render task.
+    Workers ignore SIGINT: Ctrl-C / server shutdown hits the whole
+    process group, and the parent shuts the pool down in the app lifespan.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _blank_pdf() -> bytes:
+    """A one-page blank PDF, for warming up the renderer."""
+    doc = fitz.open()
+    doc.new_page()
+    try:
+        return doc.tobytes()
+    finally:
+        doc.close()
 
-def pdf_to_images(pdf_bytes: bytes, max_pages: int = MAX_PAGES) -> list[bytes]:
+
+async def warm_up_render_pool(pool: Executor) -> None:
     """
-    Convert PDF pages to JPEG images.
+    Start every render worker and push one page through it.
+
+    The first request otherwise pays for spawning a process, importing
+    PyMuPDF and MuPDF's first-render setup.
+
+    Args:
+        pool: Render process pool (app.state.render_pool)
+    """
+    loop = asyncio.get_running_loop()
+    blank = _blank_pdf()
+    # One task per worker — the pool spawns a process for each while all are busy
+    await asyncio.gather(*[
+        loop.run_in_executor(pool, pdf_to_images, blank, [0])
+        for _ in range(settings.PDF_RENDER_WORKERS)
+    ])
+
+
+def render_scale(rect: fitz.Rect) -> float:
+    """
+    Pick the render scale for a page from its size in points.
+
+    Vision tokens and payload grow with pixel area, so the scale gives
+    a fixed long side of PDF_RENDER_PX instead of a fixed multiplier:
+    oversized pages stop producing huge images, small ones stay legible.
+    """
+    long_side = max(rect.width, rect.height) or 1
+    return settings.PDF_RENDER_PX / long_side
+
+
+def pdf_to_images(pdf_bytes: bytes, page_numbers: list[int]) -> list[bytes]:
+    """
+    Convert the given PDF pages to JPEG images.
 
-    Caps rendering at max_pages (default 10) to prevent OOM under load.
     Explicitly releases PyMuPDF pixmap memory after each page render.
+    Runs inside the render process pool, so it must stay a top-level
+    function with picklable arguments.
 
     Args:
         pdf_bytes: PDF file content
-        max_pages: Hard limit on pages to convert (default: MAX_PAGES)
+        page_numbers: 0-based pages to render, in output order
 
     Returns:
-        List of JPEG image bytes
+        List of JPEG image bytes (pages past the end are skipped)
     """
     doc = fitz.open(stream=pdf_bytes, filetype="pdf")
     images = []
 
     total_pages = len(doc)
-    pages_to_process = min(total_pages, max_pages)
+    page_numbers = [n for n in page_numbers if n < total_pages]
 
-    logger.info(f"Converting {pages_to_process}/{total_pages} PDF pages to images (cap={max_pages})")
+    if page_numbers:
+        logger.info("Converting PDF pages %s of %d to images", [n + 1 for n in page_numbers], total_pages)
 
-    for page_num in range(pages_to_process):
+    for page_num in page_numbers:
         page = doc[page_num]
-        matrix = fitz.Matrix(settings.PDF_RENDER_SCALE, settings.PDF_RENDER_SCALE)
-        pix = page.get_pixmap(matrix=matrix)
+        scale = render_scale(page.rect)
+        matrix = fitz.Matrix(scale, scale)
+        # Plain RGB without alpha is what JPEG takes — no conversion pass in tobytes
+        pix = page.get_pixmap(matrix=matrix, colorspace=fitz.csRGB, alpha=False)
 
-        img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+        # Encode straight from the pixmap — no intermediate PIL RGB copy
+        images.append(pix.tobytes("jpeg", jpg_quality=settings.PDF_JPEG_QUALITY))
         # Release pixmap memory immediately — don't hold all pages in RAM
         del pix
 
-        buf = io.BytesIO()
-        img.save(buf, format="JPEG", quality=80)
-        images.append(buf.getvalue())
-        buf.close()
-
     doc.close()
-    logger.info(f"Converted {len(images)} pages to images")
     return images
 
 
+async def render_pdf(
+    pdf_bytes: bytes,
+    pool: Executor,
+    page_numbers: list[int],
+    max_pages: int = MAX_PAGES
+) -> list[bytes]:
+    """
+    Render PDF pages to JPEG images, fanned out across the render pool.
+
+    Splits the pages into one contiguous slice per worker, so even a
+    3-page report renders its pages on separate cores.
+
+    Args:
+        pdf_bytes: PDF file content
+        pool: Render process pool (app.state.render_pool)
+        page_numbers: 0-based pages to render, e.g. from the parser's page selection
+        max_pages: Hard limit on pages to convert (default: MAX_PAGES)
+
+    Returns:
+        List of JPEG image bytes in page order
+    """
+    loop = asyncio.get_running_loop()
+    page_numbers = page_numbers[:max_pages]
+    if not page_numbers:
+        return []
+    per_task = -(-len(page_numbers) // settings.PDF_RENDER_WORKERS)  # ceil division
+
+    slices = await asyncio.gather(*[
+        loop.run_in_executor(pool, pdf_to_images, pdf_bytes, page_numbers[start:start + per_task])
+        for start in range(0, len(page_numbers), per_task)
+    ])
+    images = [img for chunk in slices for img in chunk]
+    logger.info("Converted %d pages to images", len(images))
+    return images
+
+
+def normalize_text(text: str) -> str:
+    """
+    Canonicalise a page's text layer: one space between words, no blank lines.
+
+    Re-exports of the same report differ mostly in layout whitespace;
+    normalising keeps the extraction prompt (and so its LLM cache key)
+    identical across them, and trims padding tokens from the prompt.
+    Line breaks are kept so table rows stay separate.
+    """
+    lines = (_INLINE_SPACE_RE.sub(" ", line).strip() for line in text.splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+class PdfInfo(NamedTuple):
+    """What the parser needs to know about a PDF before rendering anything."""
+    first_page_text: str  # Lowercased page 1 text layer ("" for a bare scan)
+    # Lowercased text of each inspected page, None where the page must be
+    # seen to be read (no text layer, or text on top of a scan)
+    page_texts: tuple[str | None, ...]
+    native_text: str | None  # Full text if the PDF is text-native, else None
+
+
+def inspect_pdf(pdf_bytes: bytes, max_pages: int = MAX_PAGES) -> PdfInfo:
+    """
+    Read the text layer in a single pass over one open document.
+
+    Cheap compared with rendering. Lab systems usually export digital
+    PDFs, whose text layer is exact — extracting from it skips rendering
+    and the vision model entirely. Scanned pages (no text) and OCR'd
+    scans (a page-sized image under a text layer of unknown accuracy)
+    get native_text=None so the vision path is used; their page 1 text
+    is still enough to recognise a blood report without an AI call, and
+    the per-page text lets the parser skip text-only pages that hold no
+    results.
+
+    Args:
+        pdf_bytes: PDF file content
+        max_pages: Pages to read (default: MAX_PAGES)
+
+    Returns:
+        PdfInfo for the document
+    """
+    doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+    try:
+        texts = []
+        text_only = []
+        for page_num in range(min(len(doc), max_pages)):
+            page = doc[page_num]
+            text = normalize_text(page.get_text("text"))
+            texts.append(text)
+            if not text:
+                text_only.append(False)  # Scanned page
+                continue
+
+            page_area = abs(page.rect) or 1
+            image_area = sum(abs(fitz.Rect(img["bbox"]) & page.rect) for img in page.get_image_info())
+            # Above the cap the text layer sits on top of a scan
+            text_only.append(image_area / page_area <= MAX_NATIVE_IMAGE_COVERAGE)
+    finally:
+        doc.close()
+
+    first_page_text = texts[0].lower() if texts else ""
+    page_texts = tuple(text.lower() if ok else None for text, ok in zip(texts, text_only))
+    full_text = "\n\n".join(texts)
+    if not all(text_only) or len(full_text) < MIN_NATIVE_TEXT_CHARS:
+        return PdfInfo(first_page_text, page_texts, None)
+    return PdfInfo(first_page_text, page_texts, full_text)
+
+
 def images_to_base64(images: list[bytes]) -> list[dict]:
     """
     Convert image bytes to OpenAI-compatible content format.
 
+    A full report is several MB of base64 — callers run this in an executor.
+
     Args:
         images: List of image bytes
 
     Returns:
         OpenAI content array with base64 encoded images
     """
-    content = []
-    for img in images:
-        content.append({
+    return [
+        {
             "type": "image_url",
             "image_url": {
-                "url": f"data:image/jpeg;base64,{base64.b64encode(img).decode()}"
+                "url": JPEG_DATA_URL_PREFIX + pybase64.b64encode_as_string(img),
+                "detail": "high"
             }
-        })
-    return content
+        }
+        for img in images
+    ]
 
 
 def image_to_base64(image_bytes: bytes) -> str:
     """
     Convert single image bytes to base64 string.
 
+    Uses pybase64 (SIMD-accelerated) — food photos run to several MB.
+
     Args:
         image_bytes: Image content
 
     Returns:
         Base64 encoded string
     """
-    return base64.b64encode(image_bytes).decode()
+    return pybase64.b64encode_as_string(image_bytes)
@@ -0,0 +1,65 @@
+"""
+Cache keys for reusing workout and meal plans across matching profiles.
+
+Plans are generated at creative temperature, so the prompt-level cache
+never hits — but many users share the same profile. Every field that
+changes the plan (injuries, allergies, diet type, equipment, goals, ...)
+goes into an exact-match guard key, with age, weight and height as coarse
+bands (numeric_band); a request whose guard key matches an earlier one
+reuses that plan (llm_cache.plan_cache) instead of calling the model.
+"""
+import hashlib
+
+
+# Band widths for numeric profile fields in the guard
+AGE_BAND_YEARS = 5
+WEIGHT_BAND_KG = 5
+HEIGHT_BAND_CM = 5
+
+
+def numeric_band(value: float | None, width: float) -> int | None:
+    """
+    Coarse band for a numeric profile field.
+
+    83kg and 84kg share a band, 55kg and 95kg never do.
+
+    Args:
+        value: Field value, or None if not provided
+        width: Band width in the field's unit
+
+    Returns:
+        Band index, or None when the value is missing
+    """
+    if value is None:
+        return None
+    return int(value // width)
+
+
+def _normalize_part(part) -> str:
+    """Case- and whitespace-insensitive form of one guard field."""
+    return "" if part is None else " ".join(str(part).split()).lower()
+
+
+def guard_key(namespace: str, *parts) -> str:
+    """
+    Build the exact-match plan cache key for a request.
+
+    Lists are order-insensitive and strings case- and whitespace-
+    insensitive, so ["Knee", "back"] and ["back", "knee"] land in the
+    key, as do "Lose  weight" and "lose weight".
+
+    Args:
+        namespace: Generator name ("workout", "meal_plan")
+        parts: Fields that must match exactly for a plan to be reused
+
+    Returns:
+        Short hex digest identifying the profile
+    """
+    normalized = []
+    for part in parts:
+        if isinstance(part, (list, tuple)):
+            normalized.append(",".join(sorted(_normalize_part(p) for p in part)))
+        else:
+            normalized.append(_normalize_part(part))
+    raw = namespace + "|" + "|".join(normalized)
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
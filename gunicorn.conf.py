@@ -0,0 +1,9 @@
+"""
+Gunicorn server hooks, loaded by start.sh.
+"""
+from prometheus_client import multiprocess
+
+
+def child_exit(server, worker):
+    """Tell prometheus_client a worker is gone, so its live gauges stop being reported."""
+    multiprocess.mark_process_dead(worker.pid)
@@ -13,17 +13,27 @@
 # Deploy: Set your Railway/Render start command to: sh start.sh
 # =============================================================================
 
-WORKERS=${GUNICORN_WORKERS:-4}
+export GUNICORN_WORKERS=${GUNICORN_WORKERS:-4}  # Exported: the app sizes its render pool from it
+WORKERS=${GUNICORN_WORKERS}
+export APP_ENV=${APP_ENV:-prod}  # Env vars come from the platform — don't read .env
 PORT=${PORT:-10000}
 
+# Prometheus multiprocess mode: each worker writes its metrics under this
+# directory and /metrics aggregates them. Stale files from a previous run
+# would be added in, so clear it first.
+export PROMETHEUS_MULTIPROC_DIR=${PROMETHEUS_MULTIPROC_DIR:-/tmp/resonate-prometheus}
+mkdir -p "${PROMETHEUS_MULTIPROC_DIR}"
+rm -f "${PROMETHEUS_MULTIPROC_DIR}"/*.db
+
 echo "Starting Resonate Microservice: ${WORKERS} workers on port ${PORT}"
 
 exec gunicorn app.main:app \
+  --config gunicorn.conf.py \
   --workers "${WORKERS}" \
   --worker-class uvicorn.workers.UvicornWorker \
   --bind "0.0.0.0:${PORT}" \
   --timeout 120 \
-  --keepalive 5 \
+  --keep-alive 5 \
   --max-requests 1000 \
   --max-requests-jitter 100 \
   --access-logfile - \
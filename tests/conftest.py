@@ -0,0 +1,11 @@
+"""
+Shared test setup.
+
+The app reads its configuration at import time; CI provides dummy
+values for the required secrets, and these defaults do the same for
+local runs.
+"""
+import os
+
+os.environ.setdefault("OPENAI_API_KEY", "test-key-not-real")
+os.environ.setdefault("INTERNAL_API_SECRET", "test-secret-not-real")
@@ -0,0 +1,43 @@
+"""
+Tests for the LLM response and report cache keys.
+"""
+from app.routes.parser import _report_cache_key
+from app.services import llm_cache, openai_service
+
+
+def test_report_key_ignores_biomarker_order_and_duplicates():
+    assert _report_cache_key("url:https://x/r.pdf", ["WBC", "Hemoglobin", "WBC"]) == \
+        _report_cache_key("url:https://x/r.pdf", ["Hemoglobin", "WBC"])
+
+
+def test_report_key_separates_sources_and_biomarkers():
+    keys = {
+        _report_cache_key("url:https://x/r.pdf", ["Hemoglobin"]),
+        _report_cache_key("url:https://x/other.pdf", ["Hemoglobin"]),
+        _report_cache_key("sha256:abc", ["Hemoglobin"]),
+        _report_cache_key("url:https://x/r.pdf", ["Hemoglobin", "WBC"]),
+    }
+    assert len(keys) == 4
+
+
+def test_report_key_changes_with_prompt_version(monkeypatch):
+    before = _report_cache_key("sha256:abc", ["Hemoglobin"])
+    monkeypatch.setattr(openai_service, "PROMPT_VERSION", "next")
+    assert _report_cache_key("sha256:abc", ["Hemoglobin"]) != before
+
+
+def test_llm_key_is_canonical():
+    messages = [{"role": "user", "content": "report"}]
+    assert llm_cache.make_key({"model": "m", "messages": messages, "temperature": 0}) == \
+        llm_cache.make_key({"temperature": 0, "messages": messages, "model": "m"})
+
+
+def test_llm_key_covers_model_messages_and_temperature():
+    base = {"model": "m", "messages": [{"role": "user", "content": "a"}], "temperature": 0}
+    variants = [
+        {**base, "model": "other"},
+        {**base, "messages": [{"role": "user", "content": "b"}]},
+        {**base, "temperature": 0.5},
+    ]
+    keys = {llm_cache.make_key(base), *(llm_cache.make_key(v) for v in variants)}
+    assert len(keys) == 4
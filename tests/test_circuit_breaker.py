@@ -0,0 +1,262 @@
+"""
+Tests for the upstream circuit breaker.
+"""
+import asyncio
+
+import httpx
+import openai
+import pytest
+
+from app.core import circuit_breaker
+from app.core.circuit_breaker import CircuitBreaker, CircuitOpenError
+from app.services import openai_service
+
+_REQUEST = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+
+
+class Upstream(Exception):
+    """Stand-in for a connection / 5xx error."""
+
+
+class Throttled(Exception):
+    """Stand-in for an excluded error such as a 429."""
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable time.monotonic for the breaker module."""
+    now = [1000.0]
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", lambda: now[0])
+    return now
+
+
+async def ok():
+    return "ok"
+
+
+async def fail():
+    raise Upstream()
+
+
+async def throttled():
+    raise Throttled()
+
+
+async def _trip(breaker: CircuitBreaker) -> None:
+    for _ in range(breaker.fail_max):
+        with pytest.raises(Upstream):
+            await breaker.call(fail)
+    assert breaker.is_open
+
+
+@pytest.mark.asyncio
+async def test_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(fail_max=3, reset_timeout=30)
+    await _trip(breaker)
+    with pytest.raises(CircuitOpenError):
+        await breaker.call(ok)
+
+
+@pytest.mark.asyncio
+async def test_success_resets_the_count(clock):
+    breaker = CircuitBreaker(fail_max=3, reset_timeout=30)
+    for _ in range(2):
+        with pytest.raises(Upstream):
+            await breaker.call(fail)
+    assert await breaker.call(ok) == "ok"
+    with pytest.raises(Upstream):
+        await breaker.call(fail)
+    assert not breaker.is_open
+
+
+@pytest.mark.asyncio
+async def test_excluded_errors_never_open(clock):
+    breaker = CircuitBreaker(fail_max=2, reset_timeout=30, exclude=lambda e: isinstance(e, Throttled))
+    for _ in range(5):
+        with pytest.raises(Throttled):
+            await breaker.call(throttled)
+    assert not breaker.is_open
+
+
+@pytest.mark.asyncio
+async def test_half_open_trial_closes_on_success(clock):
+    breaker = CircuitBreaker(fail_max=2, reset_timeout=30)
+    await _trip(breaker)
+    clock[0] += 31
+    assert await breaker.call(ok) == "ok"
+    assert not breaker.is_open
+
+
+@pytest.mark.asyncio
+async def test_failed_trial_reopens_for_a_full_timeout(clock):
+    breaker = CircuitBreaker(fail_max=2, reset_timeout=30)
+    await _trip(breaker)
+    clock[0] += 31
+    with pytest.raises(Upstream):
+        await breaker.call(fail)
+    clock[0] += 10
+    with pytest.raises(CircuitOpenError):
+        await breaker.call(ok)
+
+
+@pytest.mark.asyncio
+async def test_only_one_trial_at_a_time(clock):
+    breaker = CircuitBreaker(fail_max=2, reset_timeout=30)
+    await _trip(breaker)
+    clock[0] += 31
+
+    release = asyncio.Event()
+
+    async def slow():
+        await release.wait()
+        return "ok"
+
+    trial = asyncio.create_task(breaker.call(slow))
+    await asyncio.sleep(0)
+    with pytest.raises(CircuitOpenError):
+        await breaker.call(ok)
+    release.set()
+    assert await trial == "ok"
+
+
+@pytest.mark.asyncio
+async def test_straggler_failure_does_not_free_the_trial_slot(clock):
+    breaker = CircuitBreaker(fail_max=1, reset_timeout=30)
+    straggler_go = asyncio.Event()
+    trial_go = asyncio.Event()
+
+    async def straggler():
+        await straggler_go.wait()
+        raise Upstream()
+
+    async def slow_trial():
+        await trial_go.wait()
+        return "ok"
+
+    # Admitted while closed, still running when the circuit opens
+    pending = asyncio.create_task(breaker.call(straggler))
+    await asyncio.sleep(0)
+    await _trip(breaker)
+    clock[0] += 31
+
+    trial = asyncio.create_task(breaker.call(slow_trial))
+    await asyncio.sleep(0)
+    straggler_go.set()
+    with pytest.raises(Upstream):
+        await pending
+
+    # The trial is still in flight — nobody else may start a second one,
+    # however long it runs
+    clock[0] += 31
+    with pytest.raises(CircuitOpenError):
+        await breaker.call(ok)
+    trial_go.set()
+    assert await trial == "ok"
+    assert not breaker.is_open
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("half_open", [False, True])
+async def test_late_straggler_success_does_not_close(clock, half_open):
+    breaker = CircuitBreaker(fail_max=1, reset_timeout=30)
+    straggler_go = asyncio.Event()
+    trial_go = asyncio.Event()
+
+    async def straggler():
+        await straggler_go.wait()
+        return "late"
+
+    async def slow_trial():
+        await trial_go.wait()
+        raise Upstream()
+
+    # Admitted while closed, answers only after the circuit has opened
+    pending = asyncio.create_task(breaker.call(straggler))
+    await asyncio.sleep(0)
+    await _trip(breaker)
+
+    trial = None
+    if half_open:
+        clock[0] += 31
+        trial = asyncio.create_task(breaker.call(slow_trial))
+        await asyncio.sleep(0)
+
+    straggler_go.set()
+    assert await pending == "late"
+    assert breaker.is_open
+    with pytest.raises(CircuitOpenError):
+        await breaker.call(ok)
+
+    if trial is not None:
+        trial_go.set()
+        with pytest.raises(Upstream):
+            await trial
+        assert breaker.is_open
+
+
+@pytest.mark.asyncio
+async def test_late_excluded_error_does_not_close(clock):
+    breaker = CircuitBreaker(fail_max=1, reset_timeout=30, exclude=lambda e: isinstance(e, Throttled))
+    go = asyncio.Event()
+
+    async def late_throttled():
+        await go.wait()
+        raise Throttled()
+
+    pending = asyncio.create_task(breaker.call(late_throttled))
+    await asyncio.sleep(0)
+    await _trip(breaker)
+    go.set()
+    with pytest.raises(Throttled):
+        await pending
+    assert breaker.is_open
+
+
+@pytest.mark.asyncio
+async def test_cancelled_trial_lets_the_next_call_try(clock):
+    breaker = CircuitBreaker(fail_max=1, reset_timeout=30)
+    await _trip(breaker)
+    clock[0] += 31
+
+    trial = asyncio.create_task(breaker.call(asyncio.sleep, 10))
+    await asyncio.sleep(0)
+    trial.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await trial
+    assert await breaker.call(ok) == "ok"
+
+
+@pytest.mark.parametrize("status", [400, 401, 403, 404, 409, 422, 429])
+def test_openai_client_errors_are_excluded(status):
+    error = openai_service._status_error(httpx.Response(status, request=_REQUEST))
+    assert openai_service._is_client_error(error)
+
+
+@pytest.mark.parametrize("error", [
+    openai.InternalServerError("down", response=httpx.Response(503, request=_REQUEST), body=None),
+    openai.APITimeoutError(request=_REQUEST),
+    openai.APIConnectionError(request=_REQUEST),
+])
+def test_openai_outages_count(error):
+    assert not openai_service._is_client_error(error)
+
+
+@pytest.mark.asyncio
+async def test_repeated_not_found_never_opens_the_openai_breaker(clock):
+    breaker = CircuitBreaker(fail_max=2, reset_timeout=30, exclude=openai_service._is_client_error)
+
+    async def unknown_model():
+        raise openai_service._status_error(httpx.Response(404, request=_REQUEST))
+
+    for _ in range(5):
+        with pytest.raises(openai.NotFoundError):
+            await breaker.call(unknown_model)
+    assert not breaker.is_open
+
+    async def timeout():
+        raise openai.APITimeoutError(request=_REQUEST)
+
+    for _ in range(2):
+        with pytest.raises(openai.APITimeoutError):
+            await breaker.call(timeout)
+    assert breaker.is_open
@@ -0,0 +1,100 @@
+"""
+Tests for reading biomarker values from a report's text layer without AI.
+
+Lines are taken from real lab-report exports after pdf_service.normalize_text.
+"""
+import pytest
+
+from app.routes.parser import _extract_locally
+from app.services.openai_service import sanitize_key
+
+
+def _read(text: str, biomarker: str):
+    """Local reading for one biomarker, or None if extraction abstains."""
+    extracted = _extract_locally(text, [biomarker])
+    return None if extracted is None else extracted[sanitize_key(biomarker)]
+
+
+@pytest.mark.parametrize("text, biomarker, expected", [
+    ("Hemoglobin 13.5 g/dL 13.0 - 17.0", "Hemoglobin", 13.5),
+    ("Hemoglobin\n13.5\ng/dL\n13.0 - 17.0", "Hemoglobin", 13.5),
+    ("Hemoglobin\n13.5\n13.0 - 17.0", "Hemoglobin", 13.5),  # Unit column omitted
+    ("Hemoglobin 13.5 g/dL\nRBC 4.5", "Hemoglobin", 13.5),
+    ("Hemoglobin 13.5g/dL", "Hemoglobin", 13.5),
+    ("HbA1c 5.6 %", "HbA1c", 5.6),
+    ("HbA1c 5.6%", "HbA1c", 5.6),
+    ("Fasting Blood Sugar : 92 mg/dL 70 - 100", "Fasting Blood Sugar", 92),
+    ("Serum Creatinine - 0.9 mg/dL", "Serum Creatinine", 0.9),
+    ("HDL Cholesterol 45", "HDL Cholesterol", 45),
+])
+def test_reads_clean_values(text, biomarker, expected):
+    assert _read(text, biomarker) == expected
+
+
+@pytest.mark.parametrize("text, biomarker, expected", [
+    ("Platelet Count 2,50,000 /cumm 1,50,000 - 4,10,000", "Platelet Count", 250000),  # Indian lakh grouping
+    ("Platelet Count\n1,23,456\n/cumm", "Platelet Count", 123456),
+    ("WBC 7,500 /cumm 4,000 - 11,000", "WBC", 7500),  # Western grouping
+    ("Total WBC Count\n11,200\ncells/cumm", "Total WBC Count", 11200),
+    ("Platelet Count 1,234,567.5 /cumm", "Platelet Count", 1234567.5),
+])
+def test_reads_thousands_separators(text, biomarker, expected):
+    assert _read(text, biomarker) == expected
+
+
+@pytest.mark.parametrize("text, biomarker", [
+    ("HDL < 40 mg/dL", "HDL"),  # Qualified bound, not a reading
+    ("CRP <0.5 mg/L", "CRP"),
+    ("Vitamin B12 > 2000 pg/mL", "Vitamin B12"),
+    ("Troponin I ≤ 0.01 ng/mL", "Troponin I"),
+    ("Glucose\n12/03/2024", "Glucose"),  # A date
+    ("Glucose 10:30 AM", "Glucose"),  # A time
+    ("Vitamin D 1.5e2 nmol/L", "Vitamin D"),  # Exponent
+    ("Hemoglobin 13,5 g/dL", "Hemoglobin"),  # Decimal comma
+    ("WBC 7,500, see note", "WBC"),
+    ("Hemoglobin 13.0 - 17.0 14.2", "Hemoglobin"),  # Range first
+    ("Hemoglobin\n13.0 - 17.0\n14.2 g/dL", "Hemoglobin"),
+    ("Hemoglobin (13.0-17.0) 14.2", "Hemoglobin"),
+    ("Base Excess -2.1 mmol/L", "Base Excess"),  # Sign belongs to the number
+    ("T-Score -1.5", "T-Score"),
+    ("Base Excess +2 mmol/L", "Base Excess"),
+    ("Creatinine .9 mg/dL", "Creatinine"),  # Leading decimal point
+    ("Hemoglobin\n2\nRBC 4.5", "Hemoglobin"),  # Empty cell, then the next row's serial number
+    ("Hemoglobin\n2", "Hemoglobin"),
+    ("Hemoglobin 12 Jan 2024", "Hemoglobin"),  # A date
+    ("Hemoglobin 12 January 2024", "Hemoglobin"),
+    ("Glucose 95 to 110", "Glucose"),  # Worded range
+])
+def test_abstains_on_values_that_are_not_clean_readings(text, biomarker):
+    assert _extract_locally(text, [biomarker]) is None
+
+
+def test_name_must_start_the_line():
+    text = "Hemoglobin A1c 5.6 %\nLDL Cholesterol 130 mg/dL"
+    assert _extract_locally(text, ["Hemoglobin"]) is None
+    assert _extract_locally(text, ["Cholesterol"]) is None
+    assert _read(text, "Hemoglobin A1c") == 5.6
+
+
+def test_abstains_when_readings_disagree():
+    text = "Hemoglobin 13.5 g/dL\nHemoglobin 12.1 g/dL"
+    assert _extract_locally(text, ["Hemoglobin"]) is None
+
+
+def test_repeated_identical_reading_is_accepted():
+    text = "Hemoglobin 13.5 g/dL\nSummary\nHemoglobin 13.5 g/dL"
+    assert _read(text, "Hemoglobin") == 13.5
+
+
+def test_requires_every_biomarker():
+    text = "Hemoglobin 13.5 g/dL\nWBC 7,500 /cumm"
+    assert _extract_locally(text, ["Hemoglobin", "WBC", "Platelet Count"]) is None
+    assert _extract_locally(text, ["Hemoglobin", "WBC"]) == {
+        sanitize_key("Hemoglobin"): 13.5,
+        sanitize_key("WBC"): 7500,
+    }
+
+
+def test_one_unclean_reading_abstains_for_the_whole_report():
+    text = "Hemoglobin 13.5 g/dL\nHDL < 40 mg/dL"
+    assert _extract_locally(text, ["Hemoglobin", "HDL"]) is None
@@ -0,0 +1,43 @@
+"""
+Tests for choosing which pages the vision path renders.
+"""
+from app.routes.parser import _pages_to_render
+from app.services.pdf_service import PdfInfo
+
+COVER = "city diagnostics\npatient: a. kumar\nreferred by: dr. rao\npage 1 of 3"
+DISCLAIMER = "results are to be interpreted by a physician.\nend of report"
+
+
+def _pages(page_texts, biomarkers):
+    return _pages_to_render(PdfInfo("", tuple(page_texts), None), biomarkers)
+
+
+def test_skips_text_only_pages_without_results():
+    assert _pages([COVER, "tsh 2.5 µiu/ml", DISCLAIMER], ["TSH"]) == [1]
+
+
+def test_scanned_pages_are_always_rendered():
+    assert _pages([COVER, None, DISCLAIMER], ["TSH"]) == [1]
+
+
+def test_keeps_page_naming_an_alias_of_the_requested_biomarker():
+    thyroid = "thyroid profile\nthyroid stimulating hormone 2.5"
+    assert _pages([COVER, thyroid], ["TSH"]) == [1]
+    assert _pages([COVER, "tsh 2.5"], ["Thyroid Stimulating Hormone"]) == [1]
+
+
+def test_keeps_glycated_hemoglobin_page_for_hba1c():
+    assert _pages([COVER, "glycated hemoglobin\n5.6"], ["HbA1c"]) == [1]
+
+
+def test_keeps_page_with_a_measurement_even_without_known_names():
+    assert _pages([COVER, "ferritin 85 ng/ml"], ["Iron Saturation"]) == [1]
+
+
+def test_alias_matching_is_word_bounded():
+    # "hb" must not match inside "hba1c"
+    assert _pages([COVER, "see the hba1c note below", "hb 13.5"], ["Hemoglobin"]) == [2]
+
+
+def test_renders_everything_when_nothing_qualifies():
+    assert _pages([COVER, DISCLAIMER], ["TSH"]) == [0, 1]
@@ -0,0 +1,61 @@
+"""
+Tests for the plan cache's exact-match guard key.
+"""
+import pytest
+
+from app.core.config import settings
+from app.services import llm_cache, openai_service
+from app.services.plan_cache import WEIGHT_BAND_KG, guard_key, numeric_band
+
+
+def test_guard_ignores_list_order_case_and_whitespace():
+    assert guard_key("meal_plan", ["Peanuts", "milk"], "Lose  weight ") == \
+        guard_key("meal_plan", ["milk", "peanuts"], "lose weight")
+
+
+def test_guard_separates_goals():
+    assert guard_key("meal_plan", "veg", "lose weight") != guard_key("meal_plan", "veg", "gain muscle")
+
+
+def test_numeric_bands():
+    assert numeric_band(83, WEIGHT_BAND_KG) == numeric_band(84, WEIGHT_BAND_KG)
+    assert numeric_band(55, WEIGHT_BAND_KG) != numeric_band(95, WEIGHT_BAND_KG)
+    assert numeric_band(None, WEIGHT_BAND_KG) is None
+
+
+def test_guard_separates_weight_bands():
+    heavy = guard_key("meal_plan", "veg", numeric_band(95, WEIGHT_BAND_KG))
+    light = guard_key("meal_plan", "veg", numeric_band(55, WEIGHT_BAND_KG))
+    assert heavy != light
+
+
+@pytest.fixture
+def plans(monkeypatch):
+    """Fake call_chat_api that counts calls, with the plan cache enabled."""
+    state = {"calls": 0}
+
+    async def call_chat_api(system_prompt, user_prompt, temperature, raw):
+        state["calls"] += 1
+        return b'{"plan": %d}' % state["calls"]
+
+    monkeypatch.setattr(openai_service, "call_chat_api", call_chat_api)
+    monkeypatch.setattr(settings, "PLAN_CACHE_ENABLED", True)
+    monkeypatch.setattr(llm_cache, "plan_cache", llm_cache.MemoryCache(maxsize=16, ttl=60))
+    return state
+
+
+@pytest.mark.asyncio
+async def test_matching_profile_reuses_plan_without_extra_calls(plans):
+    first = await openai_service.generate_meal_plan(weight=83, allergies=["Peanuts", "milk"])
+    second = await openai_service.generate_meal_plan(weight=84, allergies=["milk", "peanuts"])
+
+    assert first == second
+    assert plans["calls"] == 1
+
+
+@pytest.mark.asyncio
+async def test_different_allergies_generate_a_new_plan(plans):
+    await openai_service.generate_meal_plan(allergies=["peanuts"])
+    await openai_service.generate_meal_plan(allergies=["shellfish"])
+
+    assert plans["calls"] == 2
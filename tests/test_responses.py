@@ -0,0 +1,35 @@
+"""
+Tests for the orjson default response class.
+"""
+import warnings
+
+from fastapi import FastAPI
+from fastapi.exceptions import FastAPIDeprecationWarning
+from fastapi.testclient import TestClient
+
+from app.core.responses import OrjsonResponse
+from app.main import app
+
+
+def test_renders_with_orjson():
+    response = OrjsonResponse({"status": "ok", 1: [1.5, None]})
+    assert response.body == b'{"status":"ok","1":[1.5,null]}'
+    assert response.media_type == "application/json"
+
+
+def test_is_the_app_default():
+    assert app.router.default_response_class is OrjsonResponse
+
+
+def test_dict_routes_render_without_deprecation_warnings():
+    demo = FastAPI(default_response_class=OrjsonResponse)
+
+    @demo.get("/values")
+    def values():
+        return {"hemoglobin": 13.5, "missing": []}
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", FastAPIDeprecationWarning)
+        response = TestClient(demo).get("/values")
+    assert response.headers["content-type"] == "application/json"
+    assert response.json() == {"hemoglobin": 13.5, "missing": []}
@@ -0,0 +1,110 @@
+"""
+Tests for sharing identical in-flight OpenAI calls in _complete_json.
+"""
+import asyncio
+import gc
+
+import pytest
+
+from app.services import llm_cache, openai_service
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """Fake _create_completion that blocks until released and counts calls."""
+    state = {"calls": 0, "release": asyncio.Event(), "error": None}
+
+    async def create_completion(messages, temperature):
+        state["calls"] += 1
+        await state["release"].wait()
+        if state["error"] is not None:
+            raise state["error"]
+        return '{"hemoglobin": 13.5}'
+
+    monkeypatch.setattr(openai_service, "_create_completion", create_completion)
+    monkeypatch.setattr(llm_cache, "cache", llm_cache.MemoryCache(maxsize=16, ttl=60))
+    return state
+
+
+def _call(content: str = "report", temperature: float = 0.0, raw: bool = False):
+    messages = [{"role": "user", "content": content}]
+    return asyncio.ensure_future(openai_service._complete_json(messages, temperature, "Test", raw))
+
+
+@pytest.mark.asyncio
+async def test_identical_calls_share_one_upstream_request(upstream):
+    first, second = _call(), _call(raw=True)
+    await asyncio.sleep(0)
+    upstream["release"].set()
+
+    assert await first == {"hemoglobin": 13.5}
+    assert await second == b'{"hemoglobin": 13.5}'
+    assert upstream["calls"] == 1
+    assert not openai_service._in_flight
+
+
+@pytest.mark.asyncio
+async def test_different_calls_are_not_shared(upstream):
+    first, second = _call("report a"), _call("report b")
+    await asyncio.sleep(0)
+    upstream["release"].set()
+    await asyncio.gather(first, second)
+    assert upstream["calls"] == 2
+
+
+@pytest.mark.asyncio
+async def test_creative_calls_are_not_shared(upstream):
+    first, second = _call(temperature=0.7), _call(temperature=0.7)
+    await asyncio.sleep(0)
+    upstream["release"].set()
+    await asyncio.gather(first, second)
+    assert upstream["calls"] == 2
+
+
+@pytest.mark.asyncio
+async def test_cancelled_leader_does_not_cancel_followers(upstream):
+    leader, follower = _call(), _call()
+    await asyncio.sleep(0)
+    leader.cancel()
+    upstream["release"].set()
+
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+    assert await follower == {"hemoglobin": 13.5}
+    assert upstream["calls"] == 1
+
+
+@pytest.mark.asyncio
+async def test_failure_reaches_every_waiter(upstream):
+    upstream["error"] = ConnectionError("upstream down")
+    first, second = _call(), _call()
+    await asyncio.sleep(0)
+    upstream["release"].set()
+
+    for waiter in (first, second):
+        with pytest.raises(ConnectionError):
+            await waiter
+    assert not openai_service._in_flight
+
+
+@pytest.mark.asyncio
+async def test_abandoned_failure_is_not_reported_as_unretrieved(upstream):
+    loop = asyncio.get_running_loop()
+    reported = []
+    loop.set_exception_handler(lambda _, context: reported.append(context))
+
+    upstream["error"] = ConnectionError("upstream down")
+    first, second = _call(), _call()
+    await asyncio.sleep(0)
+    first.cancel()
+    second.cancel()
+    await asyncio.gather(first, second, return_exceptions=True)
+
+    upstream["release"].set()
+    for _ in range(3):
+        await asyncio.sleep(0)
+    assert not openai_service._in_flight
+
+    gc.collect()
+    loop.set_exception_handler(None)
+    assert not reported